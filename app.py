@@ -1,4 +1,4 @@
-from flask import Flask, render_template, request, jsonify, redirect, url_for, session, flash
+from flask import Flask, render_template, request, jsonify, redirect, url_for, session, flash, Response
 import requests
 from datetime import datetime, date, timedelta
 import json
@@ -15,6 +15,7 @@ import random
 import string
 import sys
 import logging
+import socket
 
 # MongoDB imports - REQUIRED (no fallback to JSON)
 from mongo.connection import mongo_db
@@ -23,10 +24,22 @@ from mongo.operations.promo_ops import promo_ops
 from mongo.operations.game_ops import game_ops
 from mongo.operations.session_ops import session_ops
 from mongo.operations.device_ops import device_ops
+from mongo.operations.stats_ops import stats_ops
+from mongo.operations.game_session_ops import game_session_ops
+from mongo.operations.cache_bus_ops import cache_bus_ops
+from mongo.operations.lease_ops import lease_ops
+from mongo.operations.slot_ops import slot_ops
+from mongo.models.game_session import GameSession
+from mongo.models.slot import Slot
 from mongo.models.user import User
 from mongo.models.promo_code import PromoCode
 from mongo.models.game import Game
 from mongo.models.session import Session
+from mongo.utils.ttl_cache import TTLCache
+from catalog.feed import iter_feed_entries
+from catalog.listing import CatalogListing
+from catalog.snapshot import CatalogSnapshot
+from catalog.validator import catalog_validator
 from mongo.models.device import Device
 
 app = Flask(__name__)
@@ -36,6 +49,12 @@ app.secret_key = os.environ.get('SECRET_KEY', 'swa-dev-secret-key-change-in-prod
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+@app.before_request
+def ensure_background_workers():
+    start_cache_bus_listener()
+    start_premium_expiry_scheduler()
+    start_dashboard_stats_reconciler()
+
 # Define custom Jinja2 filters
 @app.template_filter('escapejs')
 def escapejs_filter(value):
@@ -83,6 +102,30 @@ data_cache = {
     }
 }
 
+# Launcher status lookups for check-status/check-connection polling, keyed by
+# (user_id, device_id): check-connection loads only the polled device's entry.
+# Writers that change status, devices or launcher codes invalidate entries explicitly.
+launcher_status_cache = TTLCache(
+    maxsize=int(os.environ.get('LAUNCHER_STATUS_CACHE_SIZE', 10000)),
+    ttl=float(os.environ.get('LAUNCHER_STATUS_CACHE_TTL', 10))
+)
+
+# Placeholder-name rules for catalog ingestion, as a JSON list of
+# {"name", "pattern", "ignore_case"} objects (defaults to the built-in rules)
+if os.environ.get('CATALOG_PLACEHOLDER_RULES'):
+    catalog_validator.set_rules(json.loads(os.environ['CATALOG_PLACEHOLDER_RULES']))
+
+# Cross-worker cache invalidation (one listener thread per worker process)
+CACHE_BUS_ENABLED = os.environ.get('CACHE_BUS_ENABLED', '1') == '1'
+cache_bus_state = {
+    "pid": None,
+    "lock": threading.Lock()
+}
+
+# Fields the launcher polling endpoints read from a user (the polled device's
+# active_devices entry is added by an $elemMatch projection)
+LAUNCHER_STATUS_FIELDS = ['username', 'status', 'launcher_code', 'premium_expires_at']
+
 # Cache update period in seconds
 CACHE_LIFETIME = {
     "stats": 300,  # 5 minutes for main statistics
@@ -97,17 +140,57 @@ GAMES_API = {
     "premium": "https://swa-recloud.fun/static/game2.json"  # Use an alternative working API if available
 }
 
-# Cache for game data from the external API
+# Cache for game data from the external API. The catalog is an immutable
+# CatalogSnapshot (partitions, encoded responses, listings, search index, stats)
+# that is replaced as a whole, so readers never see a half-updated catalog.
 games_api_cache = {
-    "data": None,
-    "last_updated": 0,
-    "free_games": None,
-    "premium_games": None
+    "snapshot": None
 }
 
+# Paginated game listing limits
+GAMES_PAGE_DEFAULT_LIMIT = 50
+GAMES_PAGE_MAX_LIMIT = 1000
+
 # Cache lifetime for game data (in seconds)
 GAMES_CACHE_LIFETIME = 3600  # 1 hour
 
+# Only one process fetches the upstream catalog at a time (MongoDB lease),
+# and only one thread per process tries to (refresh lock)
+GAMES_REFRESH_LEASE = 'games_catalog_refresh'
+GAMES_REFRESH_LEASE_TTL = 60  # seconds, well above the 10 s upstream timeout
+GAMES_COLD_START_WAIT = 15  # seconds to wait for another worker's first fetch
+GAMES_REFRESH_RETRY_INTERVAL = 60  # seconds between background attempts while stale
+games_refresh_lock = threading.Lock()
+games_refresh_state = {
+    "last_attempt": 0
+}
+
+# Statuses counted as premium users on the admin dashboard
+PREMIUM_STATUSES = ('Premium', 'Premium (Aligned)')
+
+# Premium expiry scheduler: one thread per worker sleeps until the next known
+# expiry; the lease makes only one worker revoke each due batch. The sleep is
+# capped so expiries set by other workers are picked up in time.
+PREMIUM_EXPIRY_LEASE = 'premium_expiry'
+PREMIUM_EXPIRY_LEASE_TTL = 60
+PREMIUM_EXPIRY_BATCH_SIZE = 100
+PREMIUM_EXPIRY_MAX_SLEEP = 300  # seconds
+premium_expiry_state = {
+    "pid": None,
+    "lock": threading.Lock(),
+    "wakeup": threading.Event()
+}
+
+# Dashboard stats reconciler: every worker runs the loop, the lease (renewed by
+# its holder each round, taken over once it lapses) lets only one of them
+# recompute the counters and age out the 24-hour windows.
+DASHBOARD_STATS_LEASE = 'dashboard_stats'
+DASHBOARD_STATS_INTERVAL = 300  # seconds
+dashboard_stats_state = {
+    "pid": None,
+    "lock": threading.Lock()
+}
+
 # Helper functions for promo codes
 def get_promo_codes():
     """Load promo codes from MongoDB"""
@@ -130,11 +213,12 @@ def generate_promo_code(length=14):
 
 def find_promo_code(code):
     """Find a promo code by its code"""
-    promo_codes = get_promo_codes()
-    for promo in promo_codes:
-        if promo['code'].upper() == code.upper():
-            return promo
-    return None
+    try:
+        promo = promo_ops.get_promo_by_code(code)
+        return promo.to_dict() if promo else None
+    except Exception as e:
+        logger.error(f"MongoDB error: {e}")
+        raise Exception(f"Cannot access MongoDB: {e}")
 
 # Helper functions for user authentication
 def get_users():
@@ -219,6 +303,69 @@ def find_user_by_id(user_id):
         logger.error(f"MongoDB error: {e}")
         raise Exception(f"Cannot access MongoDB: {e}")
 
+def find_user_fields(user_id, fields, device_id=None):
+    """Find only the given fields of a user (for hot polling endpoints)"""
+    try:
+        return user_ops.get_user_fields(user_id, fields, device_id)
+    except Exception as e:
+        logger.error(f"MongoDB error: {e}")
+        raise Exception(f"Cannot access MongoDB: {e}")
+
+def get_launcher_status(user_id, device_id=None):
+    """Cached launcher-facing view of a user (status and launcher code).
+    
+    With device_id, active_devices holds only that device's entry (and is
+    missing if the device is unknown).
+    """
+    return launcher_status_cache.get_or_load(
+        (user_id, device_id),
+        lambda: find_user_fields(user_id, LAUNCHER_STATUS_FIELDS, device_id)
+    )
+
+def invalidate_launcher_status(user_id=None, usernames=(), broadcast=True):
+    """Drop cached launcher status after a write; username-only writers pass usernames.
+    
+    The invalidation is applied locally and, with broadcast, published so the
+    other worker processes drop their copies too.
+    """
+    if user_id:
+        launcher_status_cache.invalidate_keys(lambda key: key[0] == user_id)
+    if usernames:
+        usernames = set(usernames)
+        launcher_status_cache.invalidate_where(lambda cached: cached.get('username') in usernames)
+    
+    if broadcast and CACHE_BUS_ENABLED and (user_id or usernames):
+        cache_bus_ops.publish('launcher_status', user_id, {'usernames': sorted(usernames)})
+
+def handle_cache_event(event):
+    """Apply an invalidation published by another worker process"""
+    channel = event.get('channel')
+    payload = event.get('payload') or {}
+    
+    if channel == 'launcher_status':
+        invalidate_launcher_status(event.get('key'), payload.get('usernames', ()), broadcast=False)
+    elif channel == 'games':
+        # The publishing worker already fetched upstream and wrote the catalog backups
+        load_persisted_games_catalog(payload.get('fetched_at'))
+    elif channel == 'catalog_rules':
+        catalog_validator.set_rules(payload.get('rules', []))
+    else:
+        logger.warning(f"Unknown cache event channel: {channel}")
+
+def start_cache_bus_listener():
+    """Start this process's cache event listener once (after a gunicorn fork, per worker)"""
+    if not CACHE_BUS_ENABLED or cache_bus_state["pid"] == os.getpid():
+        return
+    
+    with cache_bus_state["lock"]:
+        if cache_bus_state["pid"] == os.getpid():
+            return
+        cache_bus_state["pid"] = os.getpid()
+    
+    cache_bus_ops.ensure_collection()
+    threading.Thread(target=cache_bus_ops.listen, args=(handle_cache_event,), daemon=True).start()
+    logger.info(f"Cache event listener started in process {os.getpid()}")
+
 def is_valid_username(username):
     """Check if username is valid"""
     return re.match(r'^[a-zA-Z0-9_]{3,20}$', username) is not None
@@ -292,96 +439,71 @@ def find_user_by_launcher_code(code):
 
 def add_or_update_device(user_id, device_id, device_name, device_os):
     """Add or update a device for a user"""
-    users = get_users()
-    for user in users:
-        if user['id'] == user_id:
-            # Initialize devices list if it doesn't exist
-            if 'devices' not in user:
-                user['devices'] = []
-            
-            # Check if device already exists
-            device_exists = False
-            for device in user.get('devices', []):
-                if device['device_id'] == device_id:
-                    # Update existing device
-                    device['device_name'] = device_name
-                    device['device_os'] = device_os
-                    device['last_connection'] = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
-                    device_exists = True
-                    break
-            
-            # Add new device if it doesn't exist
-            if not device_exists:
-                user['devices'].append({
-                    'device_id': device_id,
-                    'device_name': device_name,
-                    'device_os': device_os,
-                    'first_connection': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
-                    'last_connection': datetime.now().strftime('%Y-%m-%d %H:%M:%S')
-                })
-            
-            save_users(users)
-            return True
+    user = find_user_by_id(user_id)
+    if not user:
+        return False
+    
+    current_time = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+    devices = user.get('devices', [])
     
-    return False
+    # Check if device already exists
+    device_exists = False
+    for device in devices:
+        if device['device_id'] == device_id:
+            # Update existing device
+            device['device_name'] = device_name
+            device['device_os'] = device_os
+            device['last_connection'] = current_time
+            device_exists = True
+            break
+    
+    # Add new device if it doesn't exist
+    if not device_exists:
+        devices.append({
+            'device_id': device_id,
+            'device_name': device_name,
+            'device_os': device_os,
+            'first_connection': current_time,
+            'last_connection': current_time
+        })
+    
+    user_ops.update_user(user_id, {'devices': devices})
+    return True
 
-def update_user_stats(user_id, game_id, playtime_minutes):
+def update_user_stats(user_id, game_id, playtime_minutes, user=None):
     """Update user stats based on game session data"""
-    users = get_users()
-    for user in users:
-        if user['id'] == user_id:
-            # Initialize stats fields if they don't exist
-            if 'games_played' not in user:
-                user['games_played'] = 0
-            if 'total_play_time' not in user:
-                user['total_play_time'] = "0h 0m"
-            if 'game_sessions' not in user:
-                user['game_sessions'] = []
-            
-            # Update games played count
-            game_ids = [session['game_id'] for session in user.get('game_sessions', [])]
-            if game_id not in game_ids:
-                user['games_played'] += 1
-            
-            # Update total play time
-            current_time = user['total_play_time'].split('h ')
-            current_hours = int(current_time[0])
-            current_minutes = int(current_time[1].replace('m', ''))
-            
-            total_minutes = current_hours * 60 + current_minutes + playtime_minutes
-            new_hours = total_minutes // 60
-            new_minutes = total_minutes % 60
-            user['total_play_time'] = f"{new_hours}h {new_minutes}m"
-            
-            # Get game data for recording session
-            games_data = get_games_data(force_update=False)
-            game_info = None
-            for game in games_data.values():
-                if game['id'] == game_id:
-                    game_info = game
-                    break
-            
-            # Create session record
-            session_record = {
-                'game_id': game_id,
-                'game_name': game_info['name'] if game_info else f"Game {game_id}",
-                'game_image': game_info['image'] if game_info else "",
-                'timestamp': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
-                'duration': f"{playtime_minutes//60}h {playtime_minutes%60}m",
-                'date': datetime.now().strftime('%Y-%m-%d')
-            }
-            
-            # Add to game sessions
-            user['game_sessions'].append(session_record)
-            
-            # Update last session
-            user['last_session'] = session_record
-            
-            # Save changes
-            save_users(users)
-            return True
+    if user is None:
+        user = find_user_by_id(user_id)
+    if not user:
+        return False
+    
+    # Get game data for recording session (catalog keys are string ids)
+    snapshot = current_games_catalog()
+    game_info, _ = snapshot.find_game(str(game_id)) if snapshot else (None, None)
+    
+    # Create session record
+    game_session = GameSession({
+        'user_id': user_id,
+        'game_id': game_id,
+        'game_name': game_info.get('name', f"Game {game_id}") if game_info else f"Game {game_id}",
+        'game_image': game_info.get('image', "") if game_info else "",
+        'duration': GameSession.format_duration(playtime_minutes),
+        'duration_minutes': playtime_minutes
+    })
     
-    return False
+    # Append the session to its own collection and keep only aggregates on the user;
+    # only the report that creates the played marker counts a new game
+    if not game_session_ops.record_session(game_session):
+        return False
+    new_game = game_session_ops.mark_played(user_id, game_id, game_session.timestamp)
+    if not user_ops.record_game_session(user_id, game_session.to_summary(), playtime_minutes, new_game):
+        return False
+    
+    # A user becomes daily-active with their first session in the last 24 hours
+    last_session = user.get('last_session') or {}
+    yesterday = (datetime.now() - timedelta(days=1)).strftime('%Y-%m-%d %H:%M:%S')
+    bump_dashboard_stats(game_sessions=1, daily_users=int(last_session.get('timestamp', '') < yesterday))
+    return True
 
 # User authentication routes
 @app.route('/register', methods=['GET', 'POST'])
@@ -438,9 +560,7 @@ def register():
             games_played=0,
             achievements=0,
             last_session=None,
-            game_sessions=[],
             slots=0,
-            friends=[],
             launcher_code=generate_launcher_code()  # All users get launcher code
         )
         
@@ -448,6 +568,8 @@ def register():
         if not success:
             return render_template('register.html', error='Failed to create user account')
         
+        bump_dashboard_stats(total_users=1, new_users=1)
+        
         # Log the user in
         session['user_id'] = new_user.id
         session['username'] = new_user.username
@@ -506,7 +628,13 @@ def logout():
 @app.route('/profile')
 @login_required
 def profile():
-    """User profile page"""
+    """User profile page.
+    
+    A pure read: expiries and the slots count are reconciled by the expiry
+    scheduler and the write endpoints. The page is revalidated with an ETag
+    built from the user document's version and the computed view, so an
+    unchanged profile still costs its reads but skips rendering and transfer.
+    """
     user = find_user_by_id(session['user_id'])
     if not user:
         session.pop('user_id', None)
@@ -514,213 +642,180 @@ def profile():
         session.pop('is_admin', None)
         return redirect(url_for('login'))
     
-    # Check premium expiration for this user instantly
-    if user.get('status') == 'Premium' and user.get('premium_expires_at'):
-        try:
-            expires_at = datetime.strptime(user['premium_expires_at'], '%Y-%m-%d %H:%M:%S')
-            now = datetime.now()
-            if now > expires_at:
-                # Revert to standard status
-                user['status'] = 'Standard'
-                del user['premium_expires_at']
-                
-                # Clear existing slots alignments when premium expires
-                if 'friends' in user:
-                    users = get_users()
-                    for friend_username in list(user.get('friends', [])):
-                        for u in users:
-                            if u['username'].lower() == friend_username.lower() and u.get('status') == 'Premium (Aligned)' and u.get('aligned_by') == user['username']:
-                                # Reset friend's status to Standard
-                                u['status'] = 'Standard'
-                                if 'aligned_by' in u:
-                                    del u['aligned_by']
-                                
-                                # Add to friend's history
-                                if 'premium_history' not in u:
-                                    u['premium_history'] = []
-                                
-                                u['premium_history'].append({
-                                    'date': now.strftime('%Y-%m-%d %H:%M:%S'),
-                                    'action': 'Premium Status Revoked',
-                                    'details': f"Revoked Premium because slot alignment from {user['username']} was removed (premium expired)"
-                                })
-                    
-                    # Clear user's friends list
-                    user['friends'] = []
-                    
-                    # Save changes
-                    save_users(users)
-                else:
-                    # Just save this user's changes
-                    users = get_users()
-                    for u in users:
-                        if u['id'] == user['id']:
-                            u['status'] = 'Standard'
-                            if 'premium_expires_at' in u:
-                                del u['premium_expires_at']
-                    save_users(users)
-                
-                # Fetch updated user data
-                user = find_user_by_id(session['user_id'])
-        except Exception as e:
-            print(f"Error checking premium expiration: {e}")
+    view = build_profile_view(user)
+    # Pending flash messages are rendered into the page, so it must not be reused
+    etag = None if session.get('_flashes') else profile_etag(user, view)
+    if etag and etag in request.if_none_match:
+        response = Response(status=304)
+    else:
+        response = app.make_response(render_template('profile.html', user=user, **view))
+    
+    if etag:
+        response.set_etag(etag)
+    response.headers['Cache-Control'] = 'private, no-cache'
+    response.headers['Vary'] = 'Cookie'
+    return response
+
+def profile_etag(user, view):
+    """ETag of a rendered profile: the user document's version, plus what else the page shows.
+    
+    view (build_profile_view) carries what can change without a write to the
+    user: the statuses of the users in their slots, the slots' expiry and
+    assignment, and day counts, which roll over at each expiry's time of day.
+    The query string can switch on template output (?debug=1).
+    """
+    return hashlib.sha1('|'.join((
+        user['id'],
+        str(user.get('version', 0)),
+        json.dumps(view, sort_keys=True, default=str),
+        session.get('username') or '',
+        request.query_string.decode('utf-8', 'replace')
+    )).encode('utf-8')).hexdigest()
+
+def parse_history_date(value):
+    """A '%Y-%m-%d %H:%M:%S' history timestamp as a datetime (datetime.min if malformed)"""
+    try:
+        return datetime.strptime(value, '%Y-%m-%d %H:%M:%S')
+    except (TypeError, ValueError):
+        return datetime.min
+
+def build_profile_view(user, now=None):
+    """Everything profile.html shows besides the user itself.
+    
+    The owner's slots come from one indexed query and every user they reference
+    (assigned and previously assigned friends) is resolved with a single $in
+    query, so the page costs a constant number of MongoDB round trips.
+    premium_history timestamps are parsed once and shared by the history list
+    and the per-slot alignment details.
+    """
+    now = now or datetime.now()
     
     # Add premium expiration info if available
     premium_expires = None
     if user.get('status') == 'Premium' and user.get('premium_expires_at'):
-        try:
-            expires_date = datetime.strptime(user['premium_expires_at'], '%Y-%m-%d %H:%M:%S')
-            now = datetime.now()
-            
+        expires_date = User.parse_expiry(user['premium_expires_at'])
+        if expires_date:
             days_remaining = (expires_date - now).days
             if days_remaining >= 0:
                 premium_expires = {
                     'date': expires_date.strftime('%Y-%m-%d'),
                     'days_remaining': days_remaining
                 }
-        except Exception as e:
-            print(f"Error parsing premium expiration: {e}")
+    
+    # Parse premium history once, newest first
+    history = sorted(
+        ((parse_history_date(entry.get('date')), entry) for entry in user.get('premium_history') or []),
+        key=lambda item: item[0],
+        reverse=True
+    )
+    slot_assignments = [(date, entry) for date, entry in history if entry.get('action') == 'Slot Assigned']
+    
+    # Split slots and resolve every referenced user in one query
+    active_slots = []
+    expired_slots = []
+    for slot in slot_ops.get_user_slots(user['id']):
+        if slot.is_expired(now):
+            # The user it was last assigned to, if any
+            assigned_to = slot.assigned_to or next(
+                (entry.get('username') for entry in reversed(slot.users_history)), None
+            )
+            expired_slots.append((slot, assigned_to))
+        else:
+            active_slots.append(slot)
+    
+    referenced = [slot.assigned_to for slot in active_slots if slot.assigned_to]
+    referenced += [assigned_to for _, assigned_to in expired_slots if assigned_to is not None]
+    statuses = {
+        username: data.get('status')
+        for username, data in user_ops.get_users_fields_by_usernames(referenced, ['status']).items()
+    }
     
     # Process slots information for UI display
     slots_info = []
     available_slots = 0
-    if user.get('slots_info'):
-        now = datetime.now()
+    for slot in active_slots:
+        slot_data = {'id': slot.slot_id}
         
-        # Get list of assigned users from friends list
-        assigned_users = user.get('friends', [])
-        assigned_count = len(assigned_users)
-        
-        for i, slot in enumerate(user['slots_info']):
-            # Check if slot is expired
-            if slot.get('expires_at'):
-                try:
-                    expires_at = datetime.strptime(slot['expires_at'], '%Y-%m-%d %H:%M:%S')
-                    if now > expires_at:
-                        continue  # Skip expired slots
-                except Exception as e:
-                    print(f"Error parsing slot expiration: {e}")
-                    # If there's an error parsing the date, assume it's valid
-            
-            slot_data = {'id': slot.get('id')}
-            
-            # Add expiration info if available
-            if slot.get('expires_at'):
-                try:
-                    expires_date = datetime.strptime(slot['expires_at'], '%Y-%m-%d %H:%M:%S')
-                    days_remaining = (expires_date - now).days
-                    
-                    # Only show valid expiration dates (not expired)
-                    if days_remaining >= 0:
-                        slot_data['expires'] = {
-                            'date': expires_date.strftime('%Y-%m-%d'),
-                            'days_remaining': days_remaining
-                        }
-                except Exception as e:
-                    print(f"Error parsing slot expiration: {e}")
-            else:
-                # Explicitly mark as permanent only if not expired
-                slot_data['permanent'] = True
+        # Add expiration info if available
+        expires_date = slot.expiry()
+        if expires_date:
+            days_remaining = (expires_date - now).days
             
-            # Add source and created_at information
-            if slot.get('source'):
-                slot_data['source'] = slot.get('source')
-            if slot.get('created_at'):
-                slot_data['created_at'] = slot.get('created_at')
+            # Only show valid expiration dates (not expired)
+            if days_remaining >= 0:
+                slot_data['expires'] = {
+                    'date': expires_date.strftime('%Y-%m-%d'),
+                    'days_remaining': days_remaining
+                }
+        elif not slot.expires_at:
+            # Explicitly mark as permanent only if not expired
+            slot_data['permanent'] = True
+        
+        # Add source and created_at information
+        if slot.source:
+            slot_data['source'] = slot.source
+        if slot.created_at:
+            slot_data['created_at'] = slot.created_at
+        
+        if not slot.assigned_to:
+            # This slot is available
+            available_slots += 1
+            slots_info.append(slot_data)
+            continue
+        
+        username = slot.assigned_to
+        slot_data['assigned_to'] = username
+        if username in statuses:
+            slot_data['assigned_user_status'] = statuses[username]
             
-            # Add assigned user if available for this slot
-            if i < len(assigned_users):
-                username = assigned_users[i]
-                slot_data['assigned_to'] = username
+            # Add alignment details (history is newest first)
+            alignment_info = {}
+            alignment_entries = [
+                (date, entry) for date, entry in slot_assignments if username in entry.get('details', '')
+            ]
+            if alignment_entries:
+                latest_date, latest_entry = alignment_entries[0]
+                alignment_info['aligned_at'] = latest_entry['date']
+                alignment_info['aligned_for_days'] = (now - latest_date).days
                 
-                # Get the user's status
-                assigned_user = find_user_by_username(username)
-                if assigned_user:
-                    slot_data['assigned_user_status'] = assigned_user.get('status')
-                    
-                    # Add alignment details
-                    alignment_info = {}
-                    if 'premium_history' in user:
-                        # Find the alignment history for this user
-                        alignment_entries = [
-                            entry for entry in user['premium_history'] 
-                            if entry.get('action') == 'Slot Assigned' and username in entry.get('details', '')
-                        ]
-                        if alignment_entries:
-                            # Get the most recent alignment entry
-                            latest_entry = max(alignment_entries, key=lambda x: datetime.strptime(x['date'], '%Y-%m-%d %H:%M:%S'))
-                            alignment_info['aligned_at'] = latest_entry['date']
-                            alignment_info['aligned_for_days'] = (now - datetime.strptime(latest_entry['date'], '%Y-%m-%d %H:%M:%S')).days
-                            
-                            # Get previous alignments history
-                            if len(alignment_entries) > 1:
-                                alignment_info['alignment_count'] = len(alignment_entries)
-                                alignment_info['first_aligned_at'] = min(alignment_entries, key=lambda x: datetime.strptime(x['date'], '%Y-%m-%d %H:%M:%S'))['date']
-                                
-                    slot_data['alignment_info'] = alignment_info
-            else:
-                # This slot is available
-                available_slots += 1
+                # Get previous alignments history
+                if len(alignment_entries) > 1:
+                    alignment_info['alignment_count'] = len(alignment_entries)
+                    alignment_info['first_aligned_at'] = alignment_entries[-1][1]['date']
             
-            slots_info.append(slot_data)
+            slot_data['alignment_info'] = alignment_info
+        
+        slots_info.append(slot_data)
     
     # Process expired slots for history display
     expired_slots_info = []
-    if user.get('expired_slots'):
-        for slot in user.get('expired_slots', []):
-            expired_slot_data = {
-                'id': slot.get('id'),
-                'expired_at': slot.get('expired_at'),
-                'created_at': slot.get('created_at'),
-                'source': slot.get('source', 'Unknown')
-            }
-            
-            # Add assigned user if available
-            if 'assigned_to' in slot:
-                assigned_to = slot.get('assigned_to')
-                if assigned_to is not None:
-                    expired_slot_data['assigned_to'] = assigned_to
-                    
-                    # Get user info if available
-                    assigned_user = find_user_by_username(assigned_to)
-                    if assigned_user:
-                        expired_slot_data['assigned_user_status'] = assigned_user.get('status')
-            
-            expired_slots_info.append(expired_slot_data)
-        
-        # Sort expired slots by expiration date (newest first)
-        expired_slots_info = sorted(
-            expired_slots_info,
-            key=lambda x: datetime.strptime(x['expired_at'], '%Y-%m-%d %H:%M:%S') if x.get('expired_at') else datetime.now(),
-            reverse=True
-        )
+    for slot, assigned_to in expired_slots:
+        expired_slot_data = {
+            'id': slot.slot_id,
+            'expired_at': slot.expired_at or slot.expires_at,
+            'created_at': slot.created_at,
+            'source': slot.source or 'Unknown'
+        }
+        if assigned_to is not None:
+            expired_slot_data['assigned_to'] = assigned_to
+            if assigned_to in statuses:
+                expired_slot_data['assigned_user_status'] = statuses[assigned_to]
+        expired_slots_info.append(expired_slot_data)
+    
+    # Sort expired slots by expiration date (newest first)
+    expired_slots_info.sort(
+        key=lambda x: parse_history_date(x['expired_at']) if x.get('expired_at') else now,
+        reverse=True
+    )
     
-    # Prepare premium history for display
-    premium_history = []
-    if user.get('premium_history'):
+    return {
+        'premium_expires': premium_expires,
+        'slots_info': slots_info,
         # Limit to the most recent 10 entries
-        premium_history = sorted(
-            user['premium_history'], 
-            key=lambda x: datetime.strptime(x['date'], '%Y-%m-%d %H:%M:%S'), 
-            reverse=True
-        )[:10]
-    
-    # Update the slots count based on valid slots
-    users = get_users()
-    for u in users:
-        if u['id'] == user['id']:
-            u['slots'] = len(slots_info)
-            save_users(users)
-            break
-    
-    return render_template('profile.html', 
-                          user=user, 
-                          premium_expires=premium_expires, 
-                          slots_info=slots_info,
-                          premium_history=premium_history,
-                          expired_slots_info=expired_slots_info,
-                          available_slots=available_slots
-                         )
+        'premium_history': [entry for _, entry in history[:10]],
+        'expired_slots_info': expired_slots_info,
+        'available_slots': available_slots
+    }
 
 @app.route('/profile/update', methods=['POST'])
 @login_required
@@ -755,38 +850,26 @@ def update_profile():
     if existing_email and existing_email['id'] != user['id']:
         return render_template('profile.html', user=user, message='Email already exists', message_type='error')
     
-    # Update user
-    users = get_users()
-    for u in users:
-        if u['id'] == user['id']:
-            is_admin_before = u.get('is_admin', False)  # Save admin status before update
-            u['username'] = username
-            u['email'] = email
-            
-            # Make sure admin status doesn't change when updating profile
-            u['is_admin'] = is_admin_before
-            
-            # Update session if username changed
-            if username != session['username']:
-                session['username'] = username
-            
-            # If user lost premium, clear slots
-            if u.get('status') != 'Premium':
-                if 'friends' in u and u['friends']:
-                    # Remove aligned premium from all friends
-                    for friend_username in u['friends']:
-                        for f in users:
-                            if f['username'].lower() == friend_username.lower() and f.get('status') == 'Premium (Aligned)':
-                                f['status'] = 'Standard'
-                    u['friends'] = []
-            
-            # Save changes
-            save_users(users)
-            
-            # Return updated user
-            return render_template('profile.html', user=u, message='Profile updated successfully', message_type='success')
+    # Update user (admin status is left untouched)
+    user_ops.update_user(user['id'], {'username': username, 'email': email})
+    user['username'] = username
+    user['email'] = email
+    
+    # Update session if username changed
+    if username != session['username']:
+        session['username'] = username
+    
+    # If user lost premium, clear slots
+    if user.get('status') != 'Premium':
+        # Remove aligned premium from the friends holding their slots
+        released = slot_ops.release_owner_slots([user['id']], 'revoked', datetime.now().strftime('%Y-%m-%d %H:%M:%S'))
+        if released:
+            revoked_count = user_ops.clear_aligned_premium(released)
+            invalidate_launcher_status(usernames=released)
+            bump_dashboard_stats(premium_users=-revoked_count)
     
-    return render_template('profile.html', user=user, message='Error updating profile', message_type='error')
+    # Return updated user
+    return render_template('profile.html', user=user, message='Profile updated successfully', message_type='success')
 
 @app.route('/profile/password', methods=['POST'])
 @login_required
@@ -817,18 +900,11 @@ def update_password():
         return render_template('profile.html', user=user, message='Passwords do not match', message_type='error')
     
     # Update password
-    users = get_users()
-    for u in users:
-        if u['id'] == user['id']:
-            u['password'] = hash_password(new_password)
-            
-            # Save changes
-            save_users(users)
-            
-            # Return updated user
-            return render_template('profile.html', user=u, message='Password updated successfully', message_type='success')
+    user['password'] = hash_password(new_password)
+    user_ops.update_user(user['id'], {'password': user['password']})
     
-    return render_template('profile.html', user=user, message='Error updating password', message_type='error')
+    # Return updated user
+    return render_template('profile.html', user=user, message='Password updated successfully', message_type='success')
 
 @app.route('/profile/regenerate-code', methods=['POST'])
 @login_required
@@ -856,6 +932,10 @@ def regenerate_launcher_code():
     if not success:
         return jsonify({'success': False, 'error': 'Failed to update user in database'})
     
+    invalidate_launcher_status(user_id)
+    if user.get('launcher_connected'):
+        bump_dashboard_stats(online_users=-1)
+    
     return jsonify({'success': True, 'new_code': new_code})
 
 @app.route('/profile/redeem-code', methods=['POST'])
@@ -868,218 +948,189 @@ def redeem_promo_code():
         flash('Please enter a promo code', 'error')
         return redirect(url_for('profile'))
     
-    # Find promo code
-    promo = find_promo_code(code)
-    if not promo:
-        flash('Promo code not found or already used', 'error')
-        return redirect(url_for('profile'))
-    
-    # Check if code is expired
-    if promo.get('expires_at'):
-        try:
-            expires_at = datetime.strptime(promo['expires_at'], '%Y-%m-%d')
-            if expires_at < datetime.now():
-                flash('Promo code has expired', 'error')
-                return redirect(url_for('profile'))
-        except:
-            pass  # Ignore parse errors
+    user_id = session['user_id']
+    user = find_user_by_id(user_id)
+    if not user:
+        return redirect(url_for('login'))
     
-    # Check if code has reached its usage limit
-    if promo.get('uses_limit') > 0 and promo.get('uses_count', 0) >= promo['uses_limit']:
-        flash('Promo code has reached its usage limit', 'error')
+    # Claim one use of the code atomically (limit, expiry and duplicate checks run in MongoDB)
+    timestamp = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+    redeemed = promo_ops.redeem_atomic(code, user, timestamp)
+    if not redeemed:
+        # Only the failure path pays for a second read, to explain why the claim was refused
+        promo = find_promo_code(code)
+        if not promo:
+            flash('Promo code not found or already used', 'error')
+        elif any(entry.get('id') == user_id for entry in promo.get('redeemed_by', []) if isinstance(entry, dict)):
+            flash('You have already used this promo code', 'error')
+        elif promo.get('uses_limit', 0) > 0 and promo.get('uses_count', 0) >= promo['uses_limit']:
+            flash('Promo code has reached its usage limit', 'error')
+        else:
+            flash('Promo code has expired', 'error')
         return redirect(url_for('profile'))
     
-    # Check if user already redeemed this code
-    user_id = session['user_id']
-    if user_id in promo.get('redeemed_by', []):
-        flash('You have already used this promo code', 'error')
-        return redirect(url_for('profile'))
+    promo = redeemed.to_dict()
+    previous_status = user.get('status')
     
     # Apply promo code benefits
-    users = get_users()
-    for user in users:
-        if user['id'] == user_id:
-            # Record redemption timestamp and details for history
-            timestamp = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
-            redemption_details = {
-                'promo_code': code,
-                'timestamp': timestamp,
-                'gave_premium': promo.get('gives_premium', False),
-                'premium_duration': promo.get('premium_duration', 7),
-                'gave_slots': promo.get('slots', 0),
-                'slots_duration': promo.get('slots_duration', 3)
-            }
-            
-            # Initialize premium history if it doesn't exist
-            if 'premium_history' not in user:
-                user['premium_history'] = []
-                
-            # Apply premium status if code gives it
-            if promo.get('gives_premium', False):
-                user['status'] = 'Premium'
-                
-                # Set premium source information
-                user['premium_source'] = f"Promo Code: {code}"
-                
-                # Set premium expiration based on duration
-                premium_duration = promo.get('premium_duration', 7)  # Default to permanent
-                
-                # Убедимся, что premium_duration - это число
-                if isinstance(premium_duration, str):
-                    premium_duration = int(premium_duration)
-                
-                # Calculate expiration date based on duration value
-                if premium_duration < 7:  # Only set expiration if not permanent
-                    premium_expiry = None
-                    
-                    if premium_duration == 1:  # 1 day
-                        premium_expiry = datetime.now() + timedelta(days=1)
-                    elif premium_duration == 2:  # 7 days
-                        premium_expiry = datetime.now() + timedelta(days=7)
-                    elif premium_duration == 3:  # 1 month
-                        premium_expiry = datetime.now() + timedelta(days=30)
-                    elif premium_duration == 4:  # 3 months
-                        premium_expiry = datetime.now() + timedelta(days=90)
-                    elif premium_duration == 5:  # 6 months
-                        premium_expiry = datetime.now() + timedelta(days=180)
-                    elif premium_duration == 6:  # 1 year
-                        premium_expiry = datetime.now() + timedelta(days=365)
-                    
-                    if premium_expiry:
-                        user['premium_expires_at'] = premium_expiry.strftime('%Y-%m-%d %H:%M:%S')
-                        
-                        # Add premium activation to history
-                        user['premium_history'].append({
-                            'date': timestamp,
-                            'action': 'Premium Activated',
-                            'details': f"Activated via promo code '{code}'. Expires on {premium_expiry.strftime('%Y-%m-%d %H:%M:%S')}"
-                        })
-                else:
-                    # Remove any existing expiration for permanent premium
-                    if 'premium_expires_at' in user:
-                        del user['premium_expires_at']
-                    
-                    # Add permanent premium activation to history
-                    user['premium_history'].append({
-                        'date': timestamp,
-                        'action': 'Premium Activated',
-                        'details': f"Activated via promo code '{code}'. Never expires."
-                    })
-                
-            # Add slots with duration
-            if promo.get('slots', 0) > 0:
-                slots_count = promo.get('slots', 0)
-                slots_duration_str = promo.get('slots_duration', '3')  # Default to 1 month (3)
-                
-                try:
-                    slots_duration = int(slots_duration_str)
-                except (ValueError, TypeError):
-                    slots_duration = 3 # fallback to 1 month
-
-                # Calculate expiration date based on duration value
-                slots_expiry = None
-                if slots_duration == 1:  # 1 day
-                    slots_expiry = datetime.now() + timedelta(days=1)
-                elif slots_duration == 2:  # 7 days
-                    slots_expiry = datetime.now() + timedelta(days=7)
-                elif slots_duration == 3:  # 1 month
-                    slots_expiry = datetime.now() + timedelta(days=30)
-                elif slots_duration == 4:  # 3 months
-                    slots_expiry = datetime.now() + timedelta(days=90)
-                elif slots_duration == 5:  # 6 months
-                    slots_expiry = datetime.now() + timedelta(days=180)
-                elif slots_duration == 6:  # 1 year
-                    slots_expiry = datetime.now() + timedelta(days=365)
-                elif slots_duration == 7:  # permanent
-                    slots_expiry = None
-                
-                # Initialize slots structure if it doesn't exist
-                if not user.get('slots_info'):
-                    user['slots_info'] = []
-                
-                # Add the slots activation to history
-                if slots_expiry:
-                    user['premium_history'].append({
-                        'date': timestamp,
-                        'action': f"{slots_count} Slots Added",
-                        'details': f"Added via promo code '{code}'. Expires on {slots_expiry.strftime('%Y-%m-%d %H:%M:%S')}"
-                    })
-                else:
-                    user['premium_history'].append({
-                        'date': timestamp,
-                        'action': f"{slots_count} Slots Added",
-                        'details': f"Added via promo code '{code}'. Never expires."
-                    })
-                
-                # Add the new slots with expiration
-                for _ in range(slots_count):
-                    slot_info = {
-                        'id': str(uuid.uuid4()),
-                        'source': f"Promo code: {code}",
-                        'created_at': timestamp,
-                        'users_history': [],
-                        'assigned_to': None,
-                        'last_update': timestamp
-                    }
-                    
-                    if slots_expiry:
-                        slot_info['expires_at'] = slots_expiry.strftime('%Y-%m-%d %H:%M:%S')
-                    
-                    user['slots_info'].append(slot_info)
-                
-                # Filter out expired slots and create valid_slots list
-                valid_slots = []
-                now = datetime.now()
-                for slot in user['slots_info']:
-                    if slot.get('expires_at'):
-                        try:
-                            expires_at = datetime.strptime(slot['expires_at'], '%Y-%m-%d %H:%M:%S')
-                            if now > expires_at:
-                                continue  # Skip expired slots
-                        except Exception as e:
-                            print(f"Error parsing slot expiration: {e}")
-                    valid_slots.append(slot)
+    # Record redemption details for history
+    redemption_details = {
+        'promo_code': code,
+        'timestamp': timestamp,
+        'gave_premium': promo.get('gives_premium', False),
+        'premium_duration': promo.get('premium_duration', 7),
+        'gave_slots': promo.get('slots', 0),
+        'slots_duration': promo.get('slots_duration', 3)
+    }
+    
+    # Initialize premium history if it doesn't exist
+    if 'premium_history' not in user:
+        user['premium_history'] = []
+    new_slots = []
+    
+    # Apply premium status if code gives it
+    if promo.get('gives_premium', False):
+        user['status'] = 'Premium'
+        
+        # Set premium source information
+        user['premium_source'] = f"Promo Code: {code}"
+        
+        # Set premium expiration based on duration
+        premium_duration = promo.get('premium_duration', 7)  # Default to permanent
+        
+        # Убедимся, что premium_duration - это число
+        if isinstance(premium_duration, str):
+            premium_duration = int(premium_duration)
+        
+        # Calculate expiration date based on duration value
+        if premium_duration < 7:  # Only set expiration if not permanent
+            premium_expiry = None
+            
+            if premium_duration == 1:  # 1 day
+                premium_expiry = datetime.now() + timedelta(days=1)
+            elif premium_duration == 2:  # 7 days
+                premium_expiry = datetime.now() + timedelta(days=7)
+            elif premium_duration == 3:  # 1 month
+                premium_expiry = datetime.now() + timedelta(days=30)
+            elif premium_duration == 4:  # 3 months
+                premium_expiry = datetime.now() + timedelta(days=90)
+            elif premium_duration == 5:  # 6 months
+                premium_expiry = datetime.now() + timedelta(days=180)
+            elif premium_duration == 6:  # 1 year
+                premium_expiry = datetime.now() + timedelta(days=365)
+            
+            if premium_expiry:
+                user['premium_expires_at'] = premium_expiry.strftime('%Y-%m-%d %H:%M:%S')
                 
-                # Update slots_info
-                if len(valid_slots) != len(user['slots_info']):
-                    user['slots_info'] = valid_slots
-                    
-                # Update the slots count instead of removing it
-                user['slots'] = len(valid_slots)
+                # Add premium activation to history
+                user['premium_history'].append({
+                    'date': timestamp,
+                    'action': 'Premium Activated',
+                    'details': f"Activated via promo code '{code}'. Expires on {premium_expiry.strftime('%Y-%m-%d %H:%M:%S')}"
+                })
+        else:
+            # Remove any existing expiration for permanent premium
+            user['premium_expires_at'] = None
             
-            break
+            # Add permanent premium activation to history
+            user['premium_history'].append({
+                'date': timestamp,
+                'action': 'Premium Activated',
+                'details': f"Activated via promo code '{code}'. Never expires."
+            })
     
-    # Update promo code usage
-    promo_codes = get_promo_codes()
-    for p in promo_codes:
-        if p['id'] == promo['id']:
-            # Increment usage counter
-            p['uses_count'] = p.get('uses_count', 0) + 1
-            
-            # Add user to redeemed list
-            if 'redeemed_by' not in p:
-                p['redeemed_by'] = []
-            
-            # Get user details to store in promo code
-            current_user = find_user_by_id(user_id)
-            user_data = {
-                'id': user_id,
-                'username': current_user.get('username', ''),
-                'redeemed_at': timestamp,
-                'premium_given': promo.get('gives_premium', False),
-                'slots_given': promo.get('slots', 0)
-            }
-            
-            p['redeemed_by'].append(user_data)
-            break
+    # Add slots with duration
+    if promo.get('slots', 0) > 0:
+        slots_count = promo.get('slots', 0)
+        slots_duration_str = promo.get('slots_duration', '3')  # Default to 1 month (3)
+        
+        try:
+            slots_duration = int(slots_duration_str)
+        except (ValueError, TypeError):
+            slots_duration = 3 # fallback to 1 month
+        
+        # Calculate expiration date based on duration value
+        slots_expiry = None
+        if slots_duration == 1:  # 1 day
+            slots_expiry = datetime.now() + timedelta(days=1)
+        elif slots_duration == 2:  # 7 days
+            slots_expiry = datetime.now() + timedelta(days=7)
+        elif slots_duration == 3:  # 1 month
+            slots_expiry = datetime.now() + timedelta(days=30)
+        elif slots_duration == 4:  # 3 months
+            slots_expiry = datetime.now() + timedelta(days=90)
+        elif slots_duration == 5:  # 6 months
+            slots_expiry = datetime.now() + timedelta(days=180)
+        elif slots_duration == 6:  # 1 year
+            slots_expiry = datetime.now() + timedelta(days=365)
+        elif slots_duration == 7:  # permanent
+            slots_expiry = None
+        
+        # Add the slots activation to history
+        if slots_expiry:
+            user['premium_history'].append({
+                'date': timestamp,
+                'action': f"{slots_count} Slots Added",
+                'details': f"Added via promo code '{code}'. Expires on {slots_expiry.strftime('%Y-%m-%d %H:%M:%S')}"
+            })
+        else:
+            user['premium_history'].append({
+                'date': timestamp,
+                'action': f"{slots_count} Slots Added",
+                'details': f"Added via promo code '{code}'. Never expires."
+            })
+        
+        # Add the new slots with expiration, after the user's existing ones
+        position = user_ops.allocate_slot_positions(user_id, slots_count)
+        if position is not None:
+            new_slots = [
+                Slot({
+                    'user_id': user_id,
+                    'position': position + offset,
+                    'source': f"Promo code: {code}",
+                    'created_at': timestamp,
+                    'expires_at': slots_expiry.strftime('%Y-%m-%d %H:%M:%S') if slots_expiry else None,
+                    'last_update': timestamp
+                })
+                for offset in range(slots_count)
+            ]
+        if not new_slots or slot_ops.create_slots(new_slots) != slots_count:
+            undo_promo_redemption(code, user_id, new_slots)
+            flash('Could not activate the promo code, please try again', 'error')
+            return redirect(url_for('profile'))
+        
+        # Update the slots count to the slots that are still valid
+        user['slots'] = slot_ops.count_active_slots(user_id, timestamp)
     
-    # Save changes
-    save_users(users)
-    save_promo_codes(promo_codes)
+    # Persist the benefits on this user only
+    persisted = user_ops.update_user(user_id, {
+        'status': user.get('status'),
+        'premium_source': user.get('premium_source'),
+        'premium_expires_at': user.get('premium_expires_at'),
+        'premium_history': user['premium_history'],
+        'slots': user.get('slots', 0)
+    })
+    if not persisted:
+        undo_promo_redemption(code, user_id, new_slots)
+        flash('Could not activate the promo code, please try again', 'error')
+        return redirect(url_for('profile'))
+    
+    # Only after the write, or a launcher poll in between re-caches the old status
+    invalidate_launcher_status(user_id)
+    if previous_status not in PREMIUM_STATUSES and user.get('status') in PREMIUM_STATUSES:
+        bump_dashboard_stats(premium_users=1)
+    # The new premium or slot expiry may come before the scheduler's next wakeup
+    schedule_premium_expiry()
     
     flash('Promo code activated successfully!', 'success')
     return redirect(url_for('profile'))
 
+def undo_promo_redemption(code, user_id, slots=()):
+    """Give back a claimed promo code use whose benefits could not be applied, so the user can retry"""
+    slot_ops.delete_slots([slot.slot_id for slot in slots])
+    if not promo_ops.release_redemption(code, user_id):
+        logger.error(f"Could not release promo code {code} for user {user_id} after a failed redemption")
+
 def get_stats(force_update=False):
     try:
         # Fetch online users
@@ -1178,6 +1229,66 @@ def save_games_to_backup(access, data):
     except Exception as e:
         print(f"[{datetime.now()}] Error saving games backup: {e}")
 
+def persist_games_catalog(free_games, premium_games, fetched_at):
+    """Persist the processed catalog so the other worker processes can load it.
+    
+    The games collection is the shared copy (only changed games are written);
+    the backup files are kept as a fallback for when MongoDB has no catalog.
+    """
+    games = [Game.from_catalog_entry(game_id, "free", data) for game_id, data in free_games.items()]
+    games += [Game.from_catalog_entry(game_id, "premium", data) for game_id, data in premium_games.items()]
+    sync_counts = game_ops.sync_catalog(games)
+    
+    save_games_to_backup("catalog_free", free_games)
+    save_games_to_backup("catalog_premium", premium_games)
+    stats_ops.set_games_catalog_meta({
+        'fetched_at': fetched_at,
+        'free_games': len(free_games),
+        'premium_games': len(premium_games),
+        'sync': sync_counts
+    })
+    if CACHE_BUS_ENABLED:
+        cache_bus_ops.publish('games', payload={'fetched_at': fetched_at})
+
+def set_games_catalog(free_games, premium_games, fetched_at):
+    """Build a snapshot of a new catalog off to the side, then publish it with one reference swap"""
+    snapshot = CatalogSnapshot(free_games, premium_games, fetched_at)
+    games_api_cache["snapshot"] = snapshot
+    return snapshot
+
+def current_games_catalog():
+    """The published catalog snapshot (None until one is loaded).
+    
+    Request handlers read this once and use that snapshot throughout, so a
+    concurrent refresh cannot mix two catalog versions into one response.
+    """
+    return games_api_cache["snapshot"]
+
+def games_catalog_updated_at():
+    snapshot = current_games_catalog()
+    return snapshot.fetched_at if snapshot else 0
+
+def tag_catalog_version(response, snapshot):
+    """Tell the client which catalog version a response was built from"""
+    response.headers['X-Catalog-Version'] = snapshot.version
+    return response
+
+def load_persisted_games_catalog(fetched_at=None):
+    """Adopt the catalog another worker fetched instead of refetching it upstream"""
+    catalog = game_ops.load_catalog()
+    free_games = catalog_validator.filter_games(catalog["free"], "mongo")
+    premium_games = catalog_validator.filter_games(catalog["premium"], "mongo")
+    if not free_games and not premium_games:
+        free_games = catalog_validator.filter_games(load_games_from_backup("catalog_free"), "backup")
+        premium_games = catalog_validator.filter_games(load_games_from_backup("catalog_premium"), "backup")
+    if not free_games and not premium_games:
+        return False
+    
+    # Age the adopted copy from the original fetch, not from when it was loaded
+    set_games_catalog(free_games, premium_games, fetched_at or time.time())
+    print(f"[{datetime.now()}] Games data loaded from shared catalog: {len(free_games)} free games, {len(premium_games)} premium games")
+    return True
+
 def load_games_from_backup(access):
     """Load games data from backup file"""
     backup_file = f"games_{access}_backup.json"
@@ -1501,38 +1612,164 @@ def analyze_hourly_data(game_data):
         "most_active_hour_raw": most_active_hour
     }
 
-def check_expired_premium_and_slots():
-    """Check and revoke expired premium status and slots"""
+def expire_premium_user(user, now):
+    """Revoke one expired subscription, together with the premium of the friends it aligned"""
+    guard = {"status": "Premium", "premium_expiry": {"$lte": now}}
+    if not update_user_status_to_standard(user, "Premium subscription expired.", guard):
+        # Renewed or already revoked since the lookup
+        return False
+    
+    print(f"[{now}] Revoked expired premium status for user {user['username']}")
+    return True
+
+def process_premium_expiries():
+    """Revoke every premium subscription (and expire every slot) that is due, in batches from the expiry indexes"""
+    now = datetime.now()
+    holder = worker_id()
+    if not lease_ops.acquire(PREMIUM_EXPIRY_LEASE, holder, PREMIUM_EXPIRY_LEASE_TTL):
+        # Another worker is processing this round
+        return 0
+    
+    expired_count = 0
     try:
-        users = get_users()
-        now = datetime.now()
-        updated = False
-        
-        for user in users:
-            user_updated = False
-            
-            # Check premium expiration
-            if user.get('status') == 'Premium' and user.get('premium_expires_at'):
-                try:
-                    expires_at = datetime.strptime(user['premium_expires_at'], '%Y-%m-%d %H:%M:%S')
-                    if now > expires_at:
-                        # Update user status and handle all related changes
-                        update_user_status_to_standard(user, "Premium subscription expired.")
-                        user_updated = True
-                        print(f"[{now}] Revoked expired premium status for user {user['username']}")
-                except Exception as e:
-                    print(f"[{now}] Error processing premium expiration for {user.get('username')}: {e}")
+        while True:
+            batch = user_ops.get_expired_premium_users(now, PREMIUM_EXPIRY_BATCH_SIZE)
+            revoked_count = sum(1 for user in batch if expire_premium_user(user, now))
+            expired_count += revoked_count
+            if len(batch) < PREMIUM_EXPIRY_BATCH_SIZE or not revoked_count:
+                break
+        process_slot_expiries(now)
+    finally:
+        lease_ops.release(PREMIUM_EXPIRY_LEASE, holder)
+    
+    return expired_count
+
+def process_slot_expiries(now):
+    """Expire every slot that is due, ending its alignment, and recount the owners' valid slots"""
+    timestamp = now.strftime('%Y-%m-%d %H:%M:%S')
+    owners = {}
+    while True:
+        batch = slot_ops.get_due_slots(timestamp, PREMIUM_EXPIRY_BATCH_SIZE)
+        expired = [slot for slot in batch if slot_ops.expire_slot(slot, timestamp)]
+        for slot in expired:
+            if slot.user_id not in owners:
+                owners[slot.user_id] = user_ops.get_user_fields(slot.user_id, ['username']) or {}
+            if not slot.assigned_to:
+                continue
             
-            # Rest of the function remains the same...
-            if user_updated:
-                updated = True
-        
-        if updated:
-            save_users(users)
-            print(f"[{now}] Updated users after checking expirations")
+            owner_username = owners[slot.user_id].get('username')
+            user_ops.push_premium_history(slot.user_id, {
+                'date': timestamp,
+                'action': 'Slot Expired',
+                'details': f"Slot assigned to '{slot.assigned_to}' expired"
+            })
+            revoked = owner_username and user_ops.revoke_aligned_premium(slot.assigned_to, owner_username, {
+                'date': timestamp,
+                'action': 'Premium Status Revoked',
+                'details': f"Revoked Premium because the slot from {owner_username} expired"
+            })
+            if revoked:
+                invalidate_launcher_status(usernames=[slot.assigned_to])
+                bump_dashboard_stats(premium_users=-1)
+        if len(batch) < PREMIUM_EXPIRY_BATCH_SIZE or not expired:
+            break
+    
+    # Keep the stored slots count in step (the profile page only reads it)
+    for owner_id in owners:
+        user_ops.update_user(owner_id, {'slots': slot_ops.count_active_slots(owner_id, timestamp)})
+    return len(owners)
+
+def premium_expiry_scheduler():
+    """Process due premium and slot expiries, then sleep until the next one (or until woken by a new expiry)"""
+    wakeup = premium_expiry_state["wakeup"]
+    while True:
+        wakeup.clear()
+        delay = PREMIUM_EXPIRY_MAX_SLEEP
+        try:
+            process_premium_expiries()
+            now = datetime.now()
+            expiries = [
+                user_ops.next_premium_expiry(now),
+                slot_ops.next_slot_expiry(now.strftime('%Y-%m-%d %H:%M:%S'))
+            ]
+            next_expiry = min((expiry for expiry in expiries if expiry), default=None)
+            if next_expiry:
+                delay = min(max((next_expiry - datetime.now()).total_seconds(), 0), PREMIUM_EXPIRY_MAX_SLEEP)
+        except Exception as e:
+            print(f"[{datetime.now()}] Error in premium expiry scheduler: {e}")
+        wakeup.wait(delay)
+
+def schedule_premium_expiry():
+    """Wake this worker's expiry scheduler so it picks up a newly set expiry"""
+    premium_expiry_state["wakeup"].set()
+
+def start_premium_expiry_scheduler():
+    """Start this process's premium expiry scheduler once (after a gunicorn fork, per worker)"""
+    if premium_expiry_state["pid"] == os.getpid():
+        return
+    
+    with premium_expiry_state["lock"]:
+        if premium_expiry_state["pid"] == os.getpid():
+            return
+        premium_expiry_state["pid"] = os.getpid()
+    
+    user_ops.ensure_indexes()
+    slot_ops.ensure_indexes()
+    lease_ops.ensure_indexes()
+    threading.Thread(target=premium_expiry_scheduler, daemon=True).start()
+    logger.info(f"Premium expiry scheduler started in process {os.getpid()}")
+
+def bump_dashboard_stats(**counters):
+    """Apply counter deltas to the precomputed dashboard stats without failing the request"""
+    try:
+        stats_ops.increment_dashboard_stats(counters)
+    except Exception as e:
+        logger.error(f"Error updating dashboard stats: {e}")
+
+def compute_dashboard_stats():
+    """Compute the admin dashboard counters from scratch in MongoDB"""
+    stats = user_ops.dashboard_stats(datetime.now(), PREMIUM_STATUSES)
+    stats["game_sessions"] = game_session_ops.count_sessions()
+    return stats
+
+def reconcile_dashboard_stats():
+    """Recompute the dashboard counters and overwrite the stored ones.
     
+    The write paths only ever add to the 24-hour windows (new users, daily users),
+    so this periodic pass is what ages them out and corrects any drift.
+    """
+    try:
+        values = compute_dashboard_stats()
+        stats_ops.replace_dashboard_stats(values)
+        return values
     except Exception as e:
-        print(f"[{now}] Error in check_expired_premium_and_slots: {e}")
+        print(f"[{datetime.now()}] Error reconciling dashboard stats: {e}")
+        return {}
+
+def dashboard_stats_reconciler():
+    """Reconcile the dashboard counters every interval while holding the lease"""
+    holder = worker_id()
+    while True:
+        try:
+            if lease_ops.acquire(DASHBOARD_STATS_LEASE, holder, 2 * DASHBOARD_STATS_INTERVAL):
+                reconcile_dashboard_stats()
+        except Exception as e:
+            print(f"[{datetime.now()}] Error in dashboard stats reconciler: {e}")
+        time.sleep(DASHBOARD_STATS_INTERVAL)
+
+def start_dashboard_stats_reconciler():
+    """Start this process's dashboard stats reconciler once (after a gunicorn fork, per worker)"""
+    if dashboard_stats_state["pid"] == os.getpid():
+        return
+    
+    with dashboard_stats_state["lock"]:
+        if dashboard_stats_state["pid"] == os.getpid():
+            return
+        dashboard_stats_state["pid"] = os.getpid()
+    
+    lease_ops.ensure_indexes()
+    threading.Thread(target=dashboard_stats_reconciler, daemon=True).start()
+    logger.info(f"Dashboard stats reconciler started in process {os.getpid()}")
 
 def update_cache_periodically():
     """Update cache at regular intervals"""
@@ -1545,10 +1782,6 @@ def update_cache_periodically():
         try:
             current_time = time.time()
             
-            # Check for expired premium status and slots more frequently
-            check_expired_premium_and_slots()
-            print(f"[{datetime.now()}] Checked for expired premium subscriptions and slots")
-            
             # Update stats more frequently (every 5 minutes)
             if current_time - last_stats_refresh >= stats_refresh_interval:
                 get_stats(force_update=True)
@@ -1557,11 +1790,10 @@ def update_cache_periodically():
             
             # Update games data every hour
             if current_time - last_games_refresh >= games_refresh_interval:
-                fetch_and_process_games(force_update=True)
+                refresh_games_catalog(wait=True)
                 last_games_refresh = current_time
                 print(f"[{datetime.now()}] Games data refreshed from API")
             
-            # Sleep for a shorter time for premium checks (every 5 minutes)
             time.sleep(300)  # 5 minutes
             
             # Update period stats
@@ -1583,7 +1815,7 @@ def init_cache():
         get_stats(force_update=True)
         
         # Initialize game data from external API
-        fetch_and_process_games(force_update=True)
+        ensure_games_catalog()
         
         # Create a list of tasks for initialization and start them in separate threads
         # for parallel initialization of different data types
@@ -1733,45 +1965,87 @@ def api_games(access):
     if access not in ["free", "premium"]:
         return jsonify({"error": "Invalid access type. Must be 'free' or 'premium'"}), 400
     
-    # Try to fetch and process games if needed
-    fetch_and_process_games()
+    # Serve the cached catalog; a stale one is refreshed in the background
+    ensure_games_catalog()
+    
+    snapshot = current_games_catalog()
+    if snapshot is None:
+        return jsonify({"error": "No games data available"}), 500
+    
+    # Each access type gets only its own partition; premium callers that want the
+    # union of both catalogs ask for it with include=free
+    if access == "premium" and request.args.get('include') == 'free':
+        access = "all"
+    
+    # Any paging parameter switches to the paginated listing
+    if any(param in request.args for param in ('cursor', 'limit', 'sort', 'fields')):
+        return games_page_response(snapshot, access)
     
-    # Return cached data based on access type
-    if access == "free":
-        # For free access, return only free games
-        if games_api_cache["free_games"] is None:
-            return jsonify({"error": "No free games data available"}), 500
-        return jsonify(games_api_cache["free_games"])
+    return tag_catalog_version(encoded_json_response(snapshot.encoded[access]), snapshot)
+
+def games_page_response(snapshot, access):
+    """One page of a catalog partition from its pre-sorted listing"""
+    sort = CatalogListing.parse_sort(request.args.get('sort'))
+    if sort is None:
+        return jsonify({"error": "Invalid sort key. Use name, added_at, last_update or metacritic, optionally prefixed with '-'"}), 400
+    
+    try:
+        limit = min(max(int(request.args.get('limit', GAMES_PAGE_DEFAULT_LIMIT)), 1), GAMES_PAGE_MAX_LIMIT)
+    except ValueError:
+        return jsonify({"error": "limit must be an integer"}), 400
+    
+    fields = [field.strip() for field in request.args.get('fields', '').split(',') if field.strip()]
+    
+    # Pages of an unchanged catalog are unchanged, so they can be revalidated cheaply
+    etag = hashlib.sha1(
+        (snapshot.encoded[access].etag + request.query_string.decode('utf-8', 'replace')).encode('utf-8')
+    ).hexdigest()
+    if etag in request.if_none_match:
+        response = Response(status=304)
     else:
-        # For premium access, return both free and premium games
-        if games_api_cache["free_games"] is None or games_api_cache["premium_games"] is None:
-            return jsonify({"error": "No games data available"}), 500
-        
-        # Combine free and premium games
-        combined_games = {}
-        
-        # Add free games
-        if games_api_cache["free_games"]:
-            combined_games.update(games_api_cache["free_games"])
-        
-        # Add premium games
-        if games_api_cache["premium_games"]:
-            combined_games.update(games_api_cache["premium_games"])
-        
-        return jsonify(combined_games)
+        try:
+            page = snapshot.listings[access].page(sort, limit, request.args.get('cursor'), fields)
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
+        
+        page["sort"] = ('-' if sort[1] == 'desc' else '') + sort[0]
+        page["limit"] = limit
+        response = jsonify(page)
+    
+    response.set_etag(etag)
+    response.headers['Cache-Control'] = 'no-cache'
+    return tag_catalog_version(response, snapshot)
+
+def encoded_json_response(payload):
+    """Serve a pre-encoded JSON payload, honoring If-None-Match and Accept-Encoding"""
+    if payload.etag in request.if_none_match:
+        response = Response(status=304)
+    else:
+        encoding, body = payload.choose(encoding for encoding, quality in request.accept_encodings if quality > 0)
+        response = Response(body, mimetype='application/json')
+        if encoding != 'identity':
+            response.headers['Content-Encoding'] = encoding
+    
+    response.set_etag(payload.etag)
+    response.headers['Vary'] = 'Accept-Encoding'
+    # Clients may keep the body but must revalidate it (cheap with the ETag)
+    response.headers['Cache-Control'] = 'no-cache'
+    return response
 
 @app.route('/api/games/refresh')
 @admin_required
 def refresh_games_cache():
     """Force refresh the games cache (admin only)"""
-    success = fetch_and_process_games(force_update=True)
+    success = refresh_games_catalog(force=True, wait=True)
     
     if success:
+        snapshot = current_games_catalog()
         return jsonify({
             "success": True, 
             "message": "Games cache refreshed successfully",
-            "free_games_count": len(games_api_cache["free_games"]) if games_api_cache["free_games"] else 0,
-            "premium_games_count": len(games_api_cache["premium_games"]) if games_api_cache["premium_games"] else 0
+            "free_games_count": len(snapshot.free_games),
+            "premium_games_count": len(snapshot.premium_games),
+            "version": snapshot.version
         })
     else:
         return jsonify({"success": False, "error": "Failed to refresh games cache"}), 500
@@ -1798,7 +2072,6 @@ def start_background_tasks():
 def admin_dashboard():
     """Admin dashboard page"""
     # Get basic statistics
-    users = get_users()
     free_games = get_games_data("free")
     premium_games = get_games_data("premium")
     
@@ -1821,44 +2094,18 @@ def admin_dashboard():
         }
     ]
     
-    # Calculate online users
-    online_users = sum(1 for user in users if user.get("launcher_connected", False))
-    
-    # Calculate premium users
-    premium_users = sum(1 for user in users if user.get("status") == "Premium" or user.get("status") == "Premium (Aligned)")
-    
-    # Count game sessions
-    total_game_sessions = sum(len(user.get("game_sessions", [])) for user in users)
-    
-    # Count new users in the last 24 hours
-    now = datetime.now()
-    yesterday = now - timedelta(days=1)
-    new_users = sum(1 for user in users if datetime.strptime(user.get("join_date", "2000-01-01"), '%Y-%m-%d') >= yesterday)
-    
-    # Count daily active users (users with a game session in the last 24 hours)
-    daily_users = 0
-    for user in users:
-        has_recent_session = False
-        for session in user.get("game_sessions", []):
-            try:
-                session_time = datetime.strptime(session.get("timestamp", "2000-01-01 00:00:00"), '%Y-%m-%d %H:%M:%S')
-                if session_time >= yesterday:
-                    has_recent_session = True
-                    break
-            except:
-                continue
-        if has_recent_session:
-            daily_users += 1
+    # Counters are maintained by the write paths; rebuild them if they were never computed
+    counters = stats_ops.get_dashboard_stats() or reconcile_dashboard_stats()
     
     # Prepare stats for the dashboard
     stats = {
-        "total_users": len(users),
+        "total_users": counters.get("total_users", 0),
         "games_count": len(free_games) + len(premium_games),
-        "premium_users": premium_users,
-        "online_users": online_users,
-        "daily_users": daily_users,
-        "game_sessions": total_game_sessions,
-        "new_users": new_users,
+        "premium_users": counters.get("premium_users", 0),
+        "online_users": counters.get("online_users", 0),
+        "daily_users": counters.get("daily_users", 0),
+        "game_sessions": counters.get("game_sessions", 0),
+        "new_users": counters.get("new_users", 0),
         "last_update": datetime.now().strftime("%Y-%m-%d %H:%M")
     }
     
@@ -1928,18 +2175,18 @@ def admin_create_user():
         'games_played': 0,
         'achievements': 0,
         'last_session': None,
-        'game_sessions': [],
-        'slots': 0,
-        'friends': []
+        'slots': 0
     }
     
     # Add launcher code only for Premium or Admin users
     if status == 'Premium' or status == 'Admin':
         new_user['launcher_code'] = generate_launcher_code()
     
-    users = get_users()
-    users.append(new_user)
-    save_users(users)
+    if not user_ops.create_user(User.from_dict(new_user)):
+        return render_template('admin/users.html', users=get_users(), 
+                               message='Failed to create user account', message_type='error')
+    
+    bump_dashboard_stats(total_users=1, new_users=1, premium_users=int(status in PREMIUM_STATUSES))
     
     return render_template('admin/users.html', users=get_users(), 
                            message='User created successfully', message_type='success')
@@ -1970,47 +2217,47 @@ def admin_update_user():
                                message='Invalid email address', message_type='error')
     
     # Find user to update
-    users = get_users()
-    user_to_update = None
-    for user in users:
-        if user['id'] == user_id:
-            user_to_update = user
-            break
-    
+    user_to_update = find_user_by_id(user_id)
     if not user_to_update:
         return render_template('admin/users.html', users=get_users(), 
                                message='User not found', message_type='error')
     
     # Check if username or email already exists (excluding current user)
-    for user in users:
-        if user['id'] != user_id:
-            if user['username'].lower() == username.lower():
-                return render_template('admin/users.html', users=get_users(), 
-                                      message='Username already exists', message_type='error')
-            if user['email'].lower() == email.lower():
-                return render_template('admin/users.html', users=get_users(), 
-                                      message='Email already exists', message_type='error')
+    existing_username = find_user_by_username(username)
+    if existing_username and existing_username['id'] != user_id:
+        return render_template('admin/users.html', users=get_users(), 
+                               message='Username already exists', message_type='error')
+    
+    existing_email = find_user_by_email(email)
+    if existing_email and existing_email['id'] != user_id:
+        return render_template('admin/users.html', users=get_users(), 
+                               message='Email already exists', message_type='error')
     
     # Check if status is changing from Premium/Admin to Standard
-    if user_to_update.get('status') in ['Premium', 'Admin', 'Premium (Aligned)'] and status == 'Standard':
-        update_user_status_to_standard(user_to_update, "Status changed by admin.")
+    previous_status = user_to_update.get('status')
+    if previous_status in ['Premium', 'Admin', 'Premium (Aligned)'] and status == 'Standard':
+        if update_user_status_to_standard(user_to_update, "Status changed by admin."):
+            previous_status = 'Standard'
+    
+    updates = {
+        'username': username,
+        'email': email,
+        'status': status,
+        'is_admin': is_admin
+    }
     
     # Check if status is changing to Premium or Admin
-    if user_to_update.get('status') == 'Standard' and (status == 'Premium' or status == 'Admin'):
+    if previous_status == 'Standard' and (status == 'Premium' or status == 'Admin'):
         # Generate new launcher code
-        user_to_update['launcher_code'] = generate_launcher_code()
-    
-    # Update user
-    user_to_update['username'] = username
-    user_to_update['email'] = email
-    user_to_update['status'] = status
-    user_to_update['is_admin'] = is_admin
+        updates['launcher_code'] = generate_launcher_code()
     
     # Update password if provided
     if password:
-        user_to_update['password'] = hash_password(password)
+        updates['password'] = hash_password(password)
     
-    save_users(users)
+    user_ops.update_user(user_id, updates)
+    invalidate_launcher_status(user_id)
+    bump_dashboard_stats(premium_users=int(status in PREMIUM_STATUSES) - int(previous_status in PREMIUM_STATUSES))
     
     return render_template('admin/users.html', users=get_users(), 
                            message='User updated successfully', message_type='success')
@@ -2037,9 +2284,15 @@ def admin_delete_user():
                                message='Cannot delete an admin user', message_type='error')
     
     # Delete user
-    users = get_users()
-    users = [user for user in users if user['id'] != user_id]
-    save_users(users)
+    if user_ops.delete_user(user_id):
+        invalidate_launcher_status(user_id)
+        bump_dashboard_stats(
+            total_users=-1,
+            premium_users=-int(user_to_delete.get('status') in PREMIUM_STATUSES),
+            online_users=-int(bool(user_to_delete.get('launcher_connected'))),
+            game_sessions=-game_session_ops.delete_user_sessions(user_id)
+        )
+        slot_ops.delete_user_slots(user_id)
     
     return render_template('admin/users.html', users=get_users(), 
                            message='User deleted successfully', message_type='success')
@@ -2168,14 +2421,10 @@ def admin_create_promo_code():
         if group == 'custom':
             group = request.form.get('custom_group', 'default')
         
-        # Generate a unique promo code
-        all_promo_codes = get_promo_codes()
-        existing_codes = {p['code'] for p in all_promo_codes}
-        
         # Try to generate a unique code, up to 10 attempts
         for _ in range(10):
             new_code = generate_promo_code()
-            if new_code not in existing_codes:
+            if not promo_ops.code_exists(new_code):
                 break
         else:
             # If we can't generate a unique code after 10 attempts, return an error
@@ -2203,9 +2452,10 @@ def admin_create_promo_code():
             'group': group  # Add the group field
         }
         
-        # Add the new promo code to the list and save
-        all_promo_codes.append(new_promo)
-        save_promo_codes(all_promo_codes)
+        # Save the new promo code (codes are stored in canonical upper case)
+        if not promo_ops.create_promo_code(PromoCode.from_dict(new_promo)):
+            flash('Failed to save promo code', 'error')
+            return redirect(url_for('admin_promo_codes'))
         
         flash(f'Promo code {new_code} created successfully', 'success')
         return redirect(url_for('admin_promo_codes'))
@@ -2268,9 +2518,6 @@ def admin_bulk_create_promo_code():
     if not (1 <= count <= 100):
         return jsonify({'success': False, 'error': 'Count must be between 1 and 100.'})
 
-    all_promo_codes = get_promo_codes()
-    existing_codes_set = {p['code'] for p in all_promo_codes}
-    
     current_user = find_user_by_id(session.get('user_id', ''))
     creator_username = current_user['username'] if current_user else "System"
     
@@ -2278,9 +2525,8 @@ def admin_bulk_create_promo_code():
 
     for _ in range(count):
         new_code_str = generate_promo_code()
-        while new_code_str in existing_codes_set:
+        while new_code_str in newly_created_codes or promo_ops.code_exists(new_code_str):
             new_code_str = generate_promo_code()
-        existing_codes_set.add(new_code_str)
 
         new_promo = {
             'id': str(uuid.uuid4()),
@@ -2297,10 +2543,8 @@ def admin_bulk_create_promo_code():
             'redeemed_by': [],
             'group': group  # Add the group field
         }
-        all_promo_codes.append(new_promo)
-        newly_created_codes.append(new_code_str)
-
-    save_promo_codes(all_promo_codes)
+        if promo_ops.create_promo_code(PromoCode.from_dict(new_promo)):
+            newly_created_codes.append(new_code_str)
 
     return jsonify({'success': True, 'codes': newly_created_codes})
 
@@ -2404,7 +2648,7 @@ def launcher_connect():
     
     # Handle primary device logic
     user_dict = db_user.to_dict()
-    if 'primary_device' not in user_dict:
+    if not user_dict.get('primary_device'):
         updates['primary_device'] = {
             'device_id': device_id,
             'device_name': device_name,
@@ -2469,6 +2713,10 @@ def launcher_connect():
         logger.error(f"Failed to update user {user_id} in database after launcher connection")
         return jsonify({'success': False, 'error': 'Database update failed', 'should_disconnect': True})
     
+    invalidate_launcher_status(user_id)
+    if not user_dict.get('launcher_connected'):
+        bump_dashboard_stats(online_users=1)
+    
     # Determine the status_expires value
     status_expires = "0"  # Default for unlimited premium
     premium_expires_in_days = None
@@ -2513,30 +2761,8 @@ def api_slots_add():
     if not user:
         return jsonify({'success': False, 'error': 'User not found'})
     
-    # Calculate available slots from slots_info
-    available_slots = 0
-    if 'slots_info' in user:
-        now = datetime.now()
-        assigned_users = user.get('friends', [])
-        for i, slot in enumerate(user['slots_info']):
-            # Skip already assigned slots
-            if i < len(assigned_users):
-                continue
-                
-            # Check if slot is expired
-            if slot.get('expires_at'):
-                try:
-                    expires_at = datetime.strptime(slot['expires_at'], '%Y-%m-%d %H:%M:%S')
-                    if now > expires_at:
-                        continue  # Skip expired slots
-                except Exception:
-                    pass  # If date parsing fails, count the slot
-            
-            # This is a valid available slot
-            available_slots += 1
-    
     # Check if the current user has available slots
-    if available_slots <= 0:
+    if slot_ops.count_free_slots(user['id'], datetime.now().strftime('%Y-%m-%d %H:%M:%S')) <= 0:
         return jsonify({'success': False, 'error': 'No available slots'})
     
     # Check that user has Premium status specifically (not just slots)
@@ -2550,95 +2776,42 @@ def api_slots_add():
     if username.lower() == user['username'].lower():
         return jsonify({'success': False, 'error': 'Cannot align yourself'})
     
-    # Check if already aligned
-    if username.lower() in [f.lower() for f in user.get('friends', [])]:
-        return jsonify({'success': False, 'error': 'User already aligned'})
-    
     # Find friend user
     friend_user = find_user_by_username(username)
     if not friend_user:
         return jsonify({'success': False, 'error': 'User not found'})
     
-    # Add friend
-    users = get_users()
+    # Check if already aligned
+    if slot_ops.get_assigned_slot(user['id'], friend_user['username']):
+        return jsonify({'success': False, 'error': 'User already aligned'})
+    
     timestamp = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
     
-    for u in users:
-        if u['id'] == user['id']:
-            if 'friends' not in u:
-                u['friends'] = []
-            
-            # Find first available slot
-            available_slot_index = -1
-            if 'slots_info' in u:
-                now = datetime.now()
-                for i, slot in enumerate(u['slots_info']):
-                    # Skip already assigned slots
-                    if i < len(u['friends']):
-                        continue
-        
-                    # Check if slot is expired
-                    if slot.get('expires_at'):
-                        try:
-                            expires_at = datetime.strptime(slot['expires_at'], '%Y-%m-%d %H:%M:%S')
-                            if now > expires_at:
-                                continue  # Skip expired slots
-                        except Exception:
-                            pass  # If date parsing fails, consider it valid
-                    
-                    # Found an available slot
-                    available_slot_index = i
-                    break
-            
-            if available_slot_index < 0:
-                return jsonify({'success': False, 'error': 'No available slots'})
-            
-            # Add user to friends list
-            u['friends'].append(friend_user['username'])
-            
-            # Update slot info with assignment details
-            if 'slots_info' in u and available_slot_index < len(u['slots_info']):
-                # Update slot with user assignment information
-                u['slots_info'][available_slot_index]['assigned_to'] = friend_user['username']
-                u['slots_info'][available_slot_index]['last_update'] = timestamp
-                
-                # Add to users_history
-                if 'users_history' not in u['slots_info'][available_slot_index]:
-                    u['slots_info'][available_slot_index]['users_history'] = []
-                
-                u['slots_info'][available_slot_index]['users_history'].append({
-                    'username': friend_user['username'],
-                    'assigned_at': timestamp,
-                    'status': 'active'
-                })
-            
-            # Add to history
-            if 'premium_history' not in u:
-                u['premium_history'] = []
-            
-            u['premium_history'].append({
-                'date': timestamp,
-                'action': 'Slot Assigned',
-                'details': f"Assigned slot to user '{username}'"
-            })
-            
-        if u['id'] == friend_user['id']:
-            # Mark as aligned premium
-            if u.get('status') != 'Premium':
-                u['status'] = 'Premium (Aligned)'
-                u['aligned_by'] = user['username']
-                
-                # Add to their history
-                if 'premium_history' not in u:
-                    u['premium_history'] = []
-                
-                u['premium_history'].append({
-                    'date': timestamp,
-                    'action': 'Premium Status Granted',
-                    'details': f"Granted Premium via slot alignment from {user['username']}"
-                })
+    # Claim the first free slot (atomic: concurrent requests cannot take the same
+    # slot, and the unique index stops the same friend from taking two)
+    slot = slot_ops.assign_free_slot(user['id'], friend_user['username'], timestamp)
+    if not slot:
+        if slot_ops.get_assigned_slot(user['id'], friend_user['username']):
+            return jsonify({'success': False, 'error': 'User already aligned'})
+        return jsonify({'success': False, 'error': 'No available slots'})
+    
+    user_ops.push_premium_history(user['id'], {
+        'date': timestamp,
+        'action': 'Slot Assigned',
+        'details': f"Assigned slot to user '{username}'"
+    })
+    
+    # Mark friend as aligned premium (no-op if they already have their own Premium)
+    granted = user_ops.grant_aligned_premium(friend_user['id'], user['username'], {
+        'date': timestamp,
+        'action': 'Premium Status Granted',
+        'details': f"Granted Premium via slot alignment from {user['username']}"
+    })
+    if granted:
+        invalidate_launcher_status(friend_user['id'])
+    if granted and friend_user.get('status') not in PREMIUM_STATUSES:
+        bump_dashboard_stats(premium_users=1)
     
-    save_users(users)
     return jsonify({'success': True})
 
 @app.route('/api/launcher/update-session', methods=['POST'])
@@ -2663,18 +2836,12 @@ def launcher_update_session():
         return jsonify({'success': False, 'error': 'User not found'})
     
     logger.info(f"[API] Updating session for {user['username']}: game={game_id}, playtime={playtime}min, device={device_id}")
-    success = update_user_stats(user_id, game_id, playtime)
+    success = update_user_stats(user_id, game_id, playtime, user=user)
     
     # Update device's last connection time if device_id is provided
     if device_id:
         logger.info(f"[API] Updating device {device_id} last connection time")
-        users = get_users()
-        for user in users:
-            if user['id'] == user_id and 'devices' in user:
-                for device in user['devices']:
-                    if device['device_id'] == device_id:
-                        device['last_connection'] = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
-        save_users(users)
+        user_ops.touch_device(user_id, device_id, datetime.now().strftime('%Y-%m-%d %H:%M:%S'))
     
     logger.info(f"[API] Session update complete: success={success}")
     return jsonify({'success': success})
@@ -2683,8 +2850,8 @@ def launcher_update_session():
 def check_expired_endpoint():
     """Temporary endpoint to check for expired premium subscriptions"""
     try:
-        check_expired_premium_and_slots()
-        return jsonify({'success': True, 'message': 'Checked for expired premium subscriptions'})
+        expired_count = process_premium_expiries()
+        return jsonify({'success': True, 'message': 'Checked for expired premium subscriptions', 'expired': expired_count})
     except Exception as e:
         return jsonify({'success': False, 'error': str(e)})
 
@@ -2731,99 +2898,47 @@ def api_slots_remove_user():
     if not user:
         return jsonify({'success': False, 'error': 'User not found'})
     
-    # Check if username is in user's friends list
-    if username not in user.get('friends', []):
+    # The slot holding this friend, with its 7-day reassignment cooldown
+    slot = slot_ops.get_assigned_slot(user['id'], username)
+    if not slot:
         return jsonify({'success': False, 'error': f'User {username} is not aligned to any of your slots'})
     
-    # Update user's friends list and slots_info
-    users = get_users()
     timestamp = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
-    updated = False
     
-    for u in users:
-        if u['id'] == user['id']:
-            if 'friends' in u:
-                # Find the index of the username in the friends list
-                try:
-                    friend_index = u['friends'].index(username)
-                    
-                    # Check if this slot has a last_removal_time and if it's been less than 7 days
-                    if 'slots_info' in u and friend_index < len(u['slots_info']):
-                        slot_info = u['slots_info'][friend_index]
-                        
-                        # Check if there's a last removal time for this slot
-                        if 'last_removal_time' in slot_info:
-                            try:
-                                last_removal = datetime.strptime(slot_info['last_removal_time'], '%Y-%m-%d %H:%M:%S')
-                                now = datetime.now()
-                                # Calculate if it's been less than 7 days
-                                if (now - last_removal).days < 7:
-                                    days_since_removal = (now - last_removal).days
-                                    days_until_available = 7 - days_since_removal
-                                    return jsonify({
-                                        'success': False,
-                                        'error': f'Each slot can only be reassigned once per week. Please wait {days_until_available} more day(s) before removing a user from this slot.'
-                                    })
-                            except (ValueError, KeyError):
-                                # If there's an error parsing the date, continue with removal
-                                pass
-                    
-                    # Remove from friends list
-                    u['friends'].remove(username)
-                    updated = True
-                    
-                    # Update slot history in slots_info
-                    if 'slots_info' in u and friend_index < len(u['slots_info']):
-                        slot_info = u['slots_info'][friend_index]
-                        
-                        # Update slot history
-                        if 'users_history' in slot_info:
-                            for history_entry in slot_info['users_history']:
-                                if history_entry['username'] == username and history_entry['status'] == 'active':
-                                    history_entry['status'] = 'removed'
-                                    history_entry['removed_at'] = timestamp
-                        
-                        # Add the removal timestamp to track the 7-day cooldown
-                        slot_info['last_removal_time'] = timestamp
-                        
-                        # Clear assigned_to
-                        if 'assigned_to' in slot_info:
-                            slot_info['assigned_to'] = None
-                    
-                    # Add to premium history
-                    if 'premium_history' not in u:
-                        u['premium_history'] = []
-                    
-                    u['premium_history'].append({
-                        'date': timestamp,
-                        'action': 'Slot Freed',
-                        'details': f"Removed user '{username}' from slot"
-                    })
-                except ValueError:
-                    # Username not found in friends list
-                    return jsonify({'success': False, 'error': f'User {username} is not aligned to any of your slots'})
-        
-        # Update the removed user's status
-        if u['username'] == username and u.get('status') == 'Premium (Aligned)' and u.get('aligned_by') == user['username']:
-            # Reset to Standard
-            u['status'] = 'Standard'
-            if 'aligned_by' in u:
-                del u['aligned_by']
-            
-            # Add to premium history
-            if 'premium_history' not in u:
-                u['premium_history'] = []
-            
-            u['premium_history'].append({
-                'date': timestamp,
-                'action': 'Premium Status Revoked',
-                'details': f"Revoked Premium because slot alignment from {user['username']} was removed"
-            })
-            
-            updated = True
+    if slot.last_removal_time:
+        try:
+            last_removal = datetime.strptime(slot.last_removal_time, '%Y-%m-%d %H:%M:%S')
+            now = datetime.now()
+            # Calculate if it's been less than 7 days
+            if (now - last_removal).days < 7:
+                days_since_removal = (now - last_removal).days
+                days_until_available = 7 - days_since_removal
+                return jsonify({
+                    'success': False,
+                    'error': f'Each slot can only be reassigned once per week. Please wait {days_until_available} more day(s) before removing a user from this slot.'
+                })
+        except (TypeError, ValueError):
+            # If there's an error parsing the date, continue with removal
+            pass
     
+    # Close the history entry and start the cooldown
+    updated = slot_ops.release_slot(slot, 'removed', timestamp, cooldown=True)
+    
+    # Update the removed user's status
     if updated:
-        save_users(users)
+        user_ops.push_premium_history(user['id'], {
+            'date': timestamp,
+            'action': 'Slot Freed',
+            'details': f"Removed user '{username}' from slot"
+        })
+        revoked = user_ops.revoke_aligned_premium(username, user['username'], {
+            'date': timestamp,
+            'action': 'Premium Status Revoked',
+            'details': f"Revoked Premium because slot alignment from {user['username']} was removed"
+        })
+        if revoked:
+            invalidate_launcher_status(usernames=[username])
+            bump_dashboard_stats(premium_users=-1)
         return jsonify({'success': True})
     else:
         return jsonify({'success': False, 'error': 'Failed to remove user from slot'})
@@ -2841,95 +2956,29 @@ def api_slots_disalign_self():
     if not aligned_by or user.get('status') != 'Premium (Aligned)':
         return jsonify({'success': False, 'error': 'You are not aligned by any user'})
     
-    # Find the aligning user
-    aligning_user = find_user_by_username(aligned_by)
-    if not aligning_user:
-        # If aligning user is not found, just update the current user
-        users = get_users()
-        for u in users:
-            if u['id'] == user['id']:
-                u['status'] = 'Standard'
-                if 'aligned_by' in u:
-                    del u['aligned_by']
-                
-                # Add to premium history
-                if 'premium_history' not in u:
-                    u['premium_history'] = []
-                
-                u['premium_history'].append({
-                    'date': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
-                    'action': 'Premium Status Revoked',
-                    'details': f"You disaligned yourself from {aligned_by}'s slot"
-                })
-        
-        save_users(users)
-        return jsonify({'success': True})
-    
-    # Update both users
-    users = get_users()
     timestamp = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
-    updated = False
     
-    for u in users:
-        # Update current user
-        if u['id'] == user['id']:
-            u['status'] = 'Standard'
-            if 'aligned_by' in u:
-                del u['aligned_by']
-            
-            # Add to premium history
-            if 'premium_history' not in u:
-                u['premium_history'] = []
-            
-            u['premium_history'].append({
-                'date': timestamp,
-                'action': 'Premium Status Revoked',
-                'details': f"You disaligned yourself from {aligned_by}'s slot"
-            })
-            
-            updated = True
-        
-        # Update aligning user
-        if u['id'] == aligning_user['id'] and 'friends' in u:
-            if user['username'] in u['friends']:
-                # Find the slot index
-                slot_index = u['friends'].index(user['username'])
-                
-                # Remove from friends list
-                u['friends'].remove(user['username'])
-                
-                # Update slot info
-                if 'slots_info' in u and slot_index < len(u['slots_info']):
-                    slot_info = u['slots_info'][slot_index]
-                    
-                    # Update history
-                    if 'users_history' in slot_info:
-                        for history_entry in slot_info['users_history']:
-                            if history_entry['username'] == user['username'] and history_entry['status'] == 'active':
-                                history_entry['status'] = 'self_removed'
-                                history_entry['removed_at'] = timestamp
-                    
-                    # Clear assigned_to
-                    if 'assigned_to' in slot_info:
-                        slot_info['assigned_to'] = None
-                
-                # Add to premium history
-                if 'premium_history' not in u:
-                    u['premium_history'] = []
-                
-                u['premium_history'].append({
-                    'date': timestamp,
-                    'action': 'Slot Freed',
-                    'details': f"User '{user['username']}' disaligned themselves from your slot"
-                })
-                
-                updated = True
+    # Update current user
+    revoked = user_ops.revoke_aligned_premium(user['username'], None, {
+        'date': timestamp,
+        'action': 'Premium Status Revoked',
+        'details': f"You disaligned yourself from {aligned_by}'s slot"
+    })
+    if revoked:
+        invalidate_launcher_status(user['id'])
+        bump_dashboard_stats(premium_users=-1)
     
-    if updated:
-        save_users(users)
-        return jsonify({'success': True})
-    else:
-        return jsonify({'success': False, 'error': 'Failed to disalign from slot'})
+    # Find the aligning user; if it is gone, only the current user needed updating
+    aligning_user = find_user_by_username(aligned_by)
+    slot = slot_ops.get_assigned_slot(aligning_user['id'], user['username']) if aligning_user else None
+    if slot and slot_ops.release_slot(slot, 'self_removed', timestamp):
+        user_ops.push_premium_history(aligning_user['id'], {
+            'date': timestamp,
+            'action': 'Slot Freed',
+            'details': f"User '{user['username']}' disaligned themselves from your slot"
+        })
+    
+    return jsonify({'success': True})
 
 @app.route('/api/devices/list')
 @login_required
@@ -2951,7 +3000,7 @@ def api_devices_list():
     
     # Add 'is_primary' flag to devices
     primary_device_id = None
-    if 'primary_device' in user:
+    if user.get('primary_device'):
         primary_device_id = user['primary_device'].get('device_id')
         
         # Check if primary device is in the devices list, if not add it
@@ -3000,33 +3049,14 @@ def api_devices_disconnect():
     if not user:
         return jsonify({'success': False, 'error': 'User not found'})
     
-    # Update user's devices
-    users = get_users()
-    device_found = False
-    
-    for u in users:
-        if u['id'] == user['id']:
-            # Remove from devices list
-            if 'devices' in u:
-                u['devices'] = [d for d in u['devices'] if d.get('device_id') != device_id]
-            
-            # Mark as disconnected in active_devices
-            if 'active_devices' in u:
-                for device in u['active_devices']:
-                    if device.get('device_id') == device_id:
-                        device['disconnected'] = True
-                        device['force_disconnect'] = True
-                        device_found = True
-                        break
-            
-            # Update connection status if no devices left
-            if not any(d for d in u.get('active_devices', []) if not d.get('disconnected')):
-                u['launcher_connected'] = False
-            
-            break
-    
-    if device_found:
-        save_users(users)
+    # Drop the device and flag it for forced disconnect in one update
+    if user_ops.disconnect_device(user['id'], device_id):
+        invalidate_launcher_status(user['id'])
+        still_connected = any(
+            not d.get('disconnected') for d in user.get('active_devices', []) if d.get('device_id') != device_id
+        )
+        if user.get('launcher_connected') and not still_connected:
+            bump_dashboard_stats(online_users=-1)
         return jsonify({'success': True})
     else:
         return jsonify({'success': False, 'error': 'Device not found'})
@@ -3043,7 +3073,7 @@ def launcher_check_status():
         return jsonify({'success': False, 'error': 'Invalid request', 'should_disconnect': True})
     
     user_id = data['user_id']
-    user = find_user_by_id(user_id)
+    user = get_launcher_status(user_id)
     
     if not user:
         logger.warning(f"[API] Status check for non-existent user: {user_id}")
@@ -3106,43 +3136,30 @@ def force_disconnect_user_devices(user):
     user['devices'] = []
     user['active_devices'] = []
 
-def update_user_status_to_standard(user, reason=""):
-    """Update user status to Standard and handle all related changes"""
+def update_user_status_to_standard(user, reason="", guard=None):
+    """Revoke a user's premium together with everyone aligned through their slots.
+    
+    The whole alignment tree is resolved and written in a constant number of
+    MongoDB round trips (see UserOperations.revoke_premium_cascade); the given
+    user dict is updated to match. Returns how many users were revoked, 0 if the
+    user no longer matches guard.
+    """
     if not user:
-        return
+        return 0
     
     timestamp = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+    revoked = user_ops.revoke_premium_cascade(user['id'], reason, timestamp, guard)
+    if not revoked:
+        return 0
     
-    # Update status
     user['status'] = 'Standard'
-    if 'premium_expires_at' in user:
-        del user['premium_expires_at']
-    
-    # Force disconnect all devices
+    user['premium_expires_at'] = None
     force_disconnect_user_devices(user)
+    slot_ops.release_owner_slots([entry['id'] for entry in revoked], 'revoked', timestamp)
     
-    # Add to premium history
-    if 'premium_history' not in user:
-        user['premium_history'] = []
-    
-    user['premium_history'].append({
-        'date': timestamp,
-        'action': 'Premium Status Revoked',
-        'details': f"Premium status removed. {reason} All devices disconnected."
-    })
-    
-    # Handle aligned users
-    if 'friends' in user:
-        users = get_users()
-        for friend_username in list(user.get('friends', [])):
-            for u in users:
-                if u['username'] == friend_username and u.get('status') == 'Premium (Aligned)' and u.get('aligned_by') == user['username']:
-                    # Reset friend's status and disconnect devices
-                    update_user_status_to_standard(u, f"Alignment from {user['username']} was removed.")
-        
-        # Clear user's friends list
-        user['friends'] = []
-        save_users(users)
+    invalidate_launcher_status(user['id'], usernames=[entry['username'] for entry in revoked[1:]])
+    bump_dashboard_stats(premium_users=-sum(1 for entry in revoked if entry['status'] in PREMIUM_STATUSES))
+    return len(revoked)
 
 @app.route('/api/devices/reset-primary', methods=['POST'])
 @login_required
@@ -3158,7 +3175,7 @@ def api_devices_reset_primary():
     
     # Check if user has already reset HWID within the last week
     last_reset_time = None
-    if 'device_reset_history' in user:
+    if user.get('device_reset_history'):
         # Get the most recent reset
         if user['device_reset_history']:
             last_reset = user['device_reset_history'][-1]
@@ -3177,43 +3194,35 @@ def api_devices_reset_primary():
                 # If there's an error parsing the date, continue with the reset
                 pass
     
-    users = get_users()
+    # Remove primary device binding
     updated = False
-    
-    for u in users:
-        if u['id'] == user['id']:
-            # Remove primary device binding
-            if 'primary_device' in u:
-                # Add to history if we want to keep track
-                if 'device_reset_history' not in u:
-                    u['device_reset_history'] = []
-                
-                # Record the reset with timestamp
-                timestamp = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
-                u['device_reset_history'].append({
-                    'date': timestamp,
-                    'device_id': u['primary_device'].get('device_id'),
-                    'device_name': u['primary_device'].get('device_name'),
-                    'action': 'Device Binding Reset'
-                })
-                
-                # Remove the primary device
-                del u['primary_device']
-                
-                # Also disconnect all existing devices
-                if 'active_devices' in u:
-                    for device in u['active_devices']:
-                        device['disconnected'] = True
-                        device['force_disconnect'] = True
-                        device['disconnect_reason'] = 'primary_device_reset'
-                        device['disconnected_at'] = timestamp
-                
-                u['launcher_connected'] = False
-                updated = True
-            break
+    if user.get('primary_device'):
+        # Record the reset with timestamp
+        timestamp = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+        reset_entry = {
+            'date': timestamp,
+            'device_id': user['primary_device'].get('device_id'),
+            'device_name': user['primary_device'].get('device_name'),
+            'action': 'Device Binding Reset'
+        }
+        
+        # Also disconnect all existing devices
+        active_devices = []
+        for device in user.get('active_devices', []):
+            active_devices.append(dict(
+                device,
+                disconnected=True,
+                force_disconnect=True,
+                disconnect_reason='primary_device_reset',
+                disconnected_at=timestamp
+            ))
+        
+        updated = user_ops.reset_primary_device(user['id'], reset_entry, active_devices)
     
     if updated:
-        save_users(users)
+        invalidate_launcher_status(user['id'])
+        if user.get('launcher_connected'):
+            bump_dashboard_stats(online_users=-1)
         return jsonify({'success': True, 'message': 'Primary device binding has been reset'})
     else:
         return jsonify({'success': False, 'error': 'No primary device to reset'})
@@ -3235,7 +3244,7 @@ def launcher_check_connection():
     
     user_id = data['user_id']
     device_id = data['device_id']
-    user = find_user_by_id(user_id)
+    user = get_launcher_status(user_id, device_id)
     
     if not user:
         logger.warning(f"[API] Connection check for non-existent user: {user_id}")
@@ -3256,17 +3265,15 @@ def launcher_check_connection():
             'force_disconnect': True
         })
     
-    # Check if device is in active devices
+    # Check if device is in active devices (narrowed to this device by the projection)
     device_connected = False
     force_disconnect = False
     
-    if 'active_devices' in user:
-        for device in user['active_devices']:
-            if device.get('device_id') == device_id:
-                device_connected = not device.get('disconnected', False)
-                force_disconnect = device.get('force_disconnect', False)
-                logger.info(f"[API] Device {device_id} found: connected={device_connected}, force_disconnect={force_disconnect}")
-                break
+    if user.get('active_devices'):
+        device = user['active_devices'][0]
+        device_connected = not device.get('disconnected', False)
+        force_disconnect = device.get('force_disconnect', False)
+        logger.info(f"[API] Device {device_id} found: connected={device_connected}, force_disconnect={force_disconnect}")
     
     if not device_connected and not force_disconnect:
         logger.warning(f"[API] Device {device_id} not found in active devices for {user['username']}")
@@ -3316,23 +3323,65 @@ def api_user_uniqueid(path):
         'expiry': expiry
     })
 
+@app.route('/api/admin/cache-stats')
+@admin_required
+def api_admin_cache_stats():
+    """Hit/miss counters of the in-process caches (per worker process)"""
+    return jsonify({
+        'pid': os.getpid(),
+        'launcher_status': launcher_status_cache.stats(),
+        'catalog_validator': catalog_validator.stats()
+    })
+
+@app.route('/api/admin/catalog-rules', methods=['GET', 'POST'])
+@admin_required
+def api_admin_catalog_rules():
+    """View or replace the placeholder-name rules used for catalog ingestion"""
+    if request.method == 'POST':
+        data = request.get_json(silent=True) or {}
+        rules = data.get('rules')
+        if not isinstance(rules, list) or not all(isinstance(rule, dict) for rule in rules):
+            return jsonify({'success': False, 'error': 'rules must be a list of {name, pattern, ignore_case} objects'}), 400
+        
+        try:
+            catalog_validator.set_rules(rules)
+        except ValueError as e:
+            return jsonify({'success': False, 'error': str(e)}), 400
+        
+        # Apply the same rules in the other workers; they take effect with the next catalog load
+        if CACHE_BUS_ENABLED:
+            cache_bus_ops.publish('catalog_rules', payload={'rules': catalog_validator.rules})
+    
+    return jsonify({
+        'success': True,
+        'rules': catalog_validator.rules,
+        'stats': catalog_validator.stats()
+    })
+
 @app.route('/api/admin/users')
+@admin_required
 def api_admin_users():
-    page = int(request.args.get('page', 1))
-    per_page = int(request.args.get('per_page', 5))
+    try:
+        page = int(request.args.get('page', 1))
+        per_page = int(request.args.get('per_page', 5))
+    except ValueError:
+        return jsonify({"error": "page and per_page must be integers"}), 400
+    # Clamped once, so the response describes the page that was actually queried
+    page = max(page, 1)
+    per_page = min(max(per_page, 1), 100)
     status = request.args.get('status')
-    q = request.args.get('q', '').lower()
+    q = request.args.get('q', '').strip()
+    match = request.args.get('match', 'substring')
+
+    # Filtering, search, sort and paging all run in MongoDB
+    users_page, total = user_ops.query_users_page(
+        page=page,
+        per_page=per_page,
+        status=status,
+        search=q,
+        prefix_only=(match == 'prefix')
+    )
 
-    users = get_users()
-    # Фильтрация по статусу
-    if status and status != 'all':
-        users = [u for u in users if u.get('status', '').lower() == status.lower()]
-    # Фильтрация по поиску
-    if q:
-        users = [u for u in users if q in u.get('username', '').lower() or q in u.get('email', '').lower()]
-
-    total = len(users)
-    users_page = users[(page-1)*per_page:page*per_page]
     # Формируем ответ
     result = []
     for u in users_page:
@@ -3340,7 +3389,7 @@ def api_admin_users():
             'id': u['id'],
             'username': u['username'],
             'email': u['email'],
-            'status': u['status'],
+            'status': u.get('status'),
             'joined': u.get('join_date', '')
         })
     return jsonify({
@@ -3378,74 +3427,114 @@ def api_admin_delete_promo_code():
     save_promo_codes(promo_codes)
     return jsonify({'success': True})
 
+def worker_id():
+    """Identity of this process for leases (gunicorn workers fork after import)"""
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+def adopt_persisted_games_catalog():
+    """Load the persisted catalog if another worker fetched one newer than ours"""
+    meta = stats_ops.get_games_catalog_meta()
+    if not meta or meta.get('fetched_at', 0) <= games_catalog_updated_at():
+        return False
+    if time.time() - meta['fetched_at'] > GAMES_CACHE_LIFETIME:
+        return False
+    return load_persisted_games_catalog(meta['fetched_at'])
+
+def refresh_games_catalog(force=False, wait=False):
+    """Single-flight catalog refresh.
+    
+    At most one thread per process runs this, and only the process holding the
+    MongoDB lease fetches upstream; the others adopt the persisted result.
+    Returns True if the cache holds a fresh catalog afterwards.
+    """
+    if not games_refresh_lock.acquire(blocking=wait):
+        return False
+    
+    try:
+        if not force and adopt_persisted_games_catalog():
+            return True
+        
+        holder = worker_id()
+        lease_ops.ensure_indexes()
+        if not lease_ops.acquire(GAMES_REFRESH_LEASE, holder, GAMES_REFRESH_LEASE_TTL):
+            print(f"[{datetime.now()}] Games catalog refresh already running in another worker")
+            return False
+        
+        try:
+            return fetch_and_process_games(force_update=True)
+        finally:
+            lease_ops.release(GAMES_REFRESH_LEASE, holder)
+    finally:
+        games_refresh_lock.release()
+
+def ensure_games_catalog():
+    """Make sure the games cache is usable without blocking on upstream (stale-while-revalidate).
+    
+    A stale catalog is served as is while one background refresh runs. Only a
+    worker with no catalog at all waits, first for the persisted copy and then
+    for whichever worker holds the refresh lease.
+    """
+    if current_games_catalog() is None:
+        if not adopt_persisted_games_catalog() and not refresh_games_catalog(wait=True):
+            deadline = time.time() + GAMES_COLD_START_WAIT
+            while time.time() < deadline and not adopt_persisted_games_catalog():
+                time.sleep(0.5)
+            if current_games_catalog() is None:
+                # Last resort: whatever catalog was persisted, however old
+                load_persisted_games_catalog(time.time() - GAMES_CACHE_LIFETIME)
+        return current_games_catalog() is not None
+    
+    now = time.time()
+    if (now - games_catalog_updated_at() > GAMES_CACHE_LIFETIME and
+            now - games_refresh_state["last_attempt"] > GAMES_REFRESH_RETRY_INTERVAL and
+            not games_refresh_lock.locked()):
+        games_refresh_state["last_attempt"] = now
+        threading.Thread(target=refresh_games_catalog, daemon=True).start()
+    return True
+
 def fetch_and_process_games(force_update=False):
     """Fetch games from external API and process them"""
     current_time = time.time()
     
     # Check if cache needs to be updated
-    if (games_api_cache["data"] is None or 
-            current_time - games_api_cache["last_updated"] > GAMES_CACHE_LIFETIME or
+    if (current_games_catalog() is None or 
+            current_time - games_catalog_updated_at() > GAMES_CACHE_LIFETIME or
             force_update):
         try:
             print(f"[{datetime.now()}] Fetching games data from external API")
-            response = requests.get('http://api.swa-recloud.fun/api/v3/fetch/', timeout=10)
-            
-            if response.status_code != 200:
-                print(f"[{datetime.now()}] External API error: {response.status_code}")
-                return False
-            
-            # Parse the JSON response
-            data = response.json()
+            response = requests.get('http://api.swa-recloud.fun/api/v3/fetch/', timeout=10, stream=True)
             
             # Process and categorize games
             free_games = {}
             premium_games = {}
             filtered_count = 0
             
-            # Pattern to match placeholder game names
-            placeholder_patterns = [
-                re.compile(r'^GAME\s+\d+$'),                # "GAME XX"
-                re.compile(r'^PLACEHOLDER\s*\d*$', re.I),   # "PLACEHOLDER" or "PLACEHOLDER XX"
-                re.compile(r'^TEST\s*\d*$', re.I),          # "TEST" or "TEST XX"
-                re.compile(r'^UNTITLED\s*\d*$', re.I),      # "UNTITLED" or "UNTITLED XX"
-                re.compile(r'^UNKNOWN\s*\d*$', re.I),       # "UNKNOWN" or "UNKNOWN XX"
-                re.compile(r'^UNNAMED\s*\d*$', re.I),       # "UNNAMED" or "UNNAMED XX"
-                re.compile(r'^TEMP\s*\d*$', re.I)           # "TEMP" or "TEMP XX"
-            ]
-            
-            for game_id, game_data in data.items():
-                # Skip games with no name or placeholder names
-                game_name = game_data.get('name', '').strip()
-                
-                if not game_name:
-                    filtered_count += 1
-                    continue
+            with response:
+                if response.status_code != 200:
+                    print(f"[{datetime.now()}] External API error: {response.status_code}")
+                    return False
                 
-                # Check against all placeholder patterns
-                is_placeholder = False
-                for pattern in placeholder_patterns:
-                    if pattern.match(game_name):
-                        is_placeholder = True
+                # Parse entries one at a time as the feed downloads; the raw feed is never held whole
+                for game_id, game_data in iter_feed_entries(response):
+                    # Skip games with no name or placeholder names
+                    if catalog_validator.check(game_data, "feed") is not None:
                         filtered_count += 1
-                        break
-                
-                if is_placeholder:
-                    continue
-                
-                # Categorize by access type
-                if game_data.get('access') == "1":
-                    free_games[game_id] = game_data
-                elif game_data.get('access') == "2":
-                    premium_games[game_id] = game_data
+                        continue
+                    
+                    # Categorize by access type
+                    if game_data.get('access') == "1":
+                        free_games[game_id] = game_data
+                    elif game_data.get('access') == "2":
+                        premium_games[game_id] = game_data
             
-            # Update cache
-            games_api_cache["data"] = data  # Keep the original data for reference
-            games_api_cache["free_games"] = free_games
-            games_api_cache["premium_games"] = premium_games
-            games_api_cache["last_updated"] = current_time
+            # Publish the new catalog in one step
+            set_games_catalog(free_games, premium_games, current_time)
             
             print(f"[{datetime.now()}] Games data cached: {len(free_games)} free games, {len(premium_games)} premium games")
             print(f"[{datetime.now()}] Filtered out {filtered_count} games with placeholder names")
+            
+            # Let the other workers adopt this catalog instead of fetching it again
+            persist_games_catalog(free_games, premium_games, current_time)
             return True
         except Exception as e:
             print(f"[{datetime.now()}] Error fetching game data: {e}")
@@ -3456,107 +3545,16 @@ def fetch_and_process_games(force_update=False):
 @app.route('/api/games/stats')
 def api_games_stats():
     """API endpoint to get game statistics"""
-    # Try to fetch and process games if needed
-    fetch_and_process_games()
-    
-    # Calculate statistics
-    stats = {
-        "total_games": 0,
-        "free_games": 0,
-        "premium_games": 0,
-        "genres": {},
-        "platforms": {
-            "windows": 0,
-            "mac": 0,
-            "linux": 0
-        },
-        "recently_added": [],
-        "last_updated": games_api_cache["last_updated"]
-    }
-    
-    # Process free games
-    if games_api_cache["free_games"]:
-        stats["free_games"] = len(games_api_cache["free_games"])
-        stats["total_games"] += stats["free_games"]
-        
-        # Process genre and platform stats
-        for game_id, game_data in games_api_cache["free_games"].items():
-            # Process genres
-            if game_data.get("genres"):
-                for genre in game_data["genres"]:
-                    genre_name = genre.get("description")
-                    if genre_name:
-                        if genre_name not in stats["genres"]:
-                            stats["genres"][genre_name] = 0
-                        stats["genres"][genre_name] += 1
-            
-            # Process platforms
-            if game_data.get("platforms"):
-                platforms = game_data["platforms"]
-                if platforms.get("windows"):
-                    stats["platforms"]["windows"] += 1
-                if platforms.get("mac"):
-                    stats["platforms"]["mac"] += 1
-                if platforms.get("linux"):
-                    stats["platforms"]["linux"] += 1
-    
-    # Process premium games
-    if games_api_cache["premium_games"]:
-        stats["premium_games"] = len(games_api_cache["premium_games"])
-        stats["total_games"] += stats["premium_games"]
-        
-        # Process genre and platform stats
-        for game_id, game_data in games_api_cache["premium_games"].items():
-            # Process genres
-            if game_data.get("genres"):
-                for genre in game_data["genres"]:
-                    genre_name = genre.get("description")
-                    if genre_name:
-                        if genre_name not in stats["genres"]:
-                            stats["genres"][genre_name] = 0
-                        stats["genres"][genre_name] += 1
-            
-            # Process platforms
-            if game_data.get("platforms"):
-                platforms = game_data["platforms"]
-                if platforms.get("windows"):
-                    stats["platforms"]["windows"] += 1
-                if platforms.get("mac"):
-                    stats["platforms"]["mac"] += 1
-                if platforms.get("linux"):
-                    stats["platforms"]["linux"] += 1
-    
-    # Get recently added games (last 10 from both free and premium)
-    all_games = []
-    
-    if games_api_cache["free_games"]:
-        for game_id, game_data in games_api_cache["free_games"].items():
-            if game_data.get("added_at"):
-                all_games.append({
-                    "id": game_id,
-                    "name": game_data.get("name", "Unknown"),
-                    "added_at": game_data.get("added_at"),
-                    "access": "free"
-                })
-    
-    if games_api_cache["premium_games"]:
-        for game_id, game_data in games_api_cache["premium_games"].items():
-            if game_data.get("added_at"):
-                all_games.append({
-                    "id": game_id,
-                    "name": game_data.get("name", "Unknown"),
-                    "added_at": game_data.get("added_at"),
-                    "access": "premium"
-                })
+    # Serve the cached catalog; a stale one is refreshed in the background
+    ensure_games_catalog()
     
-    # Sort by added_at (most recent first) and take top 10
-    all_games.sort(key=lambda x: x.get("added_at", ""), reverse=True)
-    stats["recently_added"] = all_games[:10]
+    snapshot = current_games_catalog()
+    if snapshot is None:
+        # Nothing loaded yet: report an empty catalog
+        return jsonify(CatalogSnapshot(None, None, 0).stats)
     
-    # Sort genres by count (most popular first)
-    stats["genres"] = dict(sorted(stats["genres"].items(), key=lambda item: item[1], reverse=True))
-    
-    return jsonify(stats)
+    # Computed once when the catalog was loaded
+    return tag_catalog_version(encoded_json_response(snapshot.encoded_stats), snapshot)
 
 @app.route('/api/games/search')
 def api_games_search():
@@ -3565,89 +3563,41 @@ def api_games_search():
     query = request.args.get('q', '').lower()
     access = request.args.get('access', 'all')  # 'all', 'free', or 'premium'
     genre = request.args.get('genre', '')
-    limit = min(int(request.args.get('limit', 50)), 100)  # Maximum 100 results
+    try:
+        limit = min(max(int(request.args.get('limit', 50)), 1), 100)  # Maximum 100 results
+    except ValueError:
+        return jsonify({"error": "limit must be an integer"}), 400
     
     if not query and not genre:
         return jsonify({"error": "Search query or genre filter required"}), 400
     
-    # Try to fetch and process games if needed
-    fetch_and_process_games()
+    # Serve the cached catalog; a stale one is refreshed in the background
+    ensure_games_catalog()
     
-    # Prepare results
+    # Postings lookups in the index built with the catalog, best matches first
+    snapshot = current_games_catalog()
     results = []
+    if snapshot is not None:
+        results = snapshot.search.search(query, access, genre, limit)
     
-    # Search in free games
-    if access in ['all', 'free'] and games_api_cache["free_games"]:
-        for game_id, game_data in games_api_cache["free_games"].items():
-            # Check if game matches search criteria
-            if query and query not in game_data.get("name", "").lower():
-                continue
-                
-            # Check genre filter if provided
-            if genre and not any(g.get("description") == genre for g in game_data.get("genres", [])):
-                continue
-                
-            # Add to results
-            results.append({
-                "id": game_id,
-                "name": game_data.get("name", "Unknown"),
-                "image": game_data.get("image", ""),
-                "release_date": game_data.get("release_date", ""),
-                "genres": [g.get("description") for g in game_data.get("genres", [])],
-                "access": "free"
-            })
-    
-    # Search in premium games
-    if access in ['all', 'premium'] and games_api_cache["premium_games"]:
-        for game_id, game_data in games_api_cache["premium_games"].items():
-            # Check if game matches search criteria
-            if query and query not in game_data.get("name", "").lower():
-                continue
-                
-            # Check genre filter if provided
-            if genre and not any(g.get("description") == genre for g in game_data.get("genres", [])):
-                continue
-                
-            # Add to results
-            results.append({
-                "id": game_id,
-                "name": game_data.get("name", "Unknown"),
-                "image": game_data.get("image", ""),
-                "release_date": game_data.get("release_date", ""),
-                "genres": [g.get("description") for g in game_data.get("genres", [])],
-                "access": "premium"
-            })
-    
-    # Sort results by name
-    results.sort(key=lambda x: x.get("name", ""))
-    
-    # Limit results
-    results = results[:limit]
-    
-    return jsonify({
+    response = jsonify({
         "query": query,
         "access": access,
         "genre": genre,
         "count": len(results),
         "results": results
     })
+    return tag_catalog_version(response, snapshot) if snapshot else response
 
 @app.route('/api/games/detail/<game_id>')
 def api_game_detail(game_id):
     """API endpoint to get detailed information about a specific game"""
-    # Try to fetch and process games if needed
-    fetch_and_process_games()
+    # Serve the cached catalog; a stale one is refreshed in the background
+    ensure_games_catalog()
     
     # Look for the game in both free and premium collections
-    game_data = None
-    access_type = None
-    
-    if games_api_cache["free_games"] and game_id in games_api_cache["free_games"]:
-        game_data = games_api_cache["free_games"][game_id]
-        access_type = "free"
-    elif games_api_cache["premium_games"] and game_id in games_api_cache["premium_games"]:
-        game_data = games_api_cache["premium_games"][game_id]
-        access_type = "premium"
+    snapshot = current_games_catalog()
+    game_data, access_type = snapshot.find_game(game_id) if snapshot else (None, None)
     
     if not game_data:
         return jsonify({"error": f"Game with ID {game_id} not found"}), 404
@@ -3656,7 +3606,7 @@ def api_game_detail(game_id):
     result = dict(game_data)
     result["access_type"] = access_type
     
-    return jsonify(result)
+    return tag_catalog_version(jsonify(result), snapshot)
 
 def get_promo_code_groups():
     """Get list of all promo code groups"""
@@ -0,0 +1 @@
+# Games catalog package initialization
\ No newline at end of file
@@ -0,0 +1,57 @@
+import gzip
+import hashlib
+import json
+from typing import Any, Dict, Iterable, Optional, Tuple
+
+try:
+    import brotli
+except ImportError:  # listed in requirements.txt; without it only gzip is served
+    brotli = None
+
+# Every worker encodes each catalog partition when it adopts a snapshot, on the
+# request path: mid levels keep that fast for nearly the size of the maximum ones
+GZIP_LEVEL = 6
+BROTLI_QUALITY = 5
+
+class EncodedPayload:
+    """A JSON response body serialized and compressed once, served many times.
+    
+    Holds the identity, gzip and (if the brotli package is installed) br
+    variants of the same body, plus a strong ETag derived from its content.
+    """
+    
+    def __init__(self, body: bytes):
+        self.body = body
+        self.etag = hashlib.sha1(body).hexdigest()
+        self.variants = {
+            'identity': body,
+            'gzip': gzip.compress(body, compresslevel=GZIP_LEVEL, mtime=0)
+        }
+        if brotli is not None:
+            self.variants['br'] = brotli.compress(body, quality=BROTLI_QUALITY)
+    
+    @classmethod
+    def from_object(cls, obj: Any) -> 'EncodedPayload':
+        return cls(json.dumps(obj, sort_keys=True, separators=(',', ':')).encode('utf-8'))
+    
+    def choose(self, accepted: Iterable[str]) -> Tuple[str, bytes]:
+        """Pick the most compact variant the client accepts"""
+        accepted = set(accepted)
+        for encoding in ('br', 'gzip'):
+            if encoding in accepted and encoding in self.variants:
+                return encoding, self.variants[encoding]
+        return 'identity', self.body
+    
+    def sizes(self) -> Dict[str, int]:
+        return {encoding: len(data) for encoding, data in self.variants.items()}
+
+def encode_catalog(free_games: Optional[Dict[str, Any]],
+                   premium_games: Optional[Dict[str, Any]]) -> Dict[str, EncodedPayload]:
+    """Pre-encode the catalog responses: one per access partition, plus the union of both"""
+    combined = dict(free_games or {})
+    combined.update(premium_games or {})
+    return {
+        'free': EncodedPayload.from_object(free_games or {}),
+        'premium': EncodedPayload.from_object(premium_games or {}),
+        'all': EncodedPayload.from_object(combined)
+    }
\ No newline at end of file
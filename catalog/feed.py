@@ -0,0 +1,104 @@
+import codecs
+import json
+from typing import Any, Iterable, Iterator, Tuple
+
+try:
+    import ijson
+except ImportError:  # optional: falls back to the incremental raw_decode parser below
+    ijson = None
+
+FEED_CHUNK_SIZE = 64 * 1024
+
+_WHITESPACE = ' \t\n\r'
+
+_decoder = json.JSONDecoder()
+
+def iter_feed_entries(response, chunk_size: int = FEED_CHUNK_SIZE) -> Iterator[Tuple[str, Any]]:
+    """Yield (game_id, game_data) pairs from a streamed upstream feed response.
+    
+    The feed is one JSON object keyed by game id. Entries are parsed one at a
+    time while the body downloads, so neither the raw body nor the whole
+    decoded feed is ever held in memory. Uses ijson when installed.
+    """
+    if ijson is not None:
+        response.raw.decode_content = True
+        yield from ijson.kvitems(response.raw, '', use_float=True)
+    else:
+        yield from iter_object_items(response.iter_content(chunk_size))
+
+def _skip_whitespace(buffer: str, pos: int) -> int:
+    while pos < len(buffer) and buffer[pos] in _WHITESPACE:
+        pos += 1
+    return pos
+
+def iter_object_items(chunks: Iterable[bytes]) -> Iterator[Tuple[str, Any]]:
+    """Incrementally parse a top-level JSON object from byte chunks, one member at a time.
+    
+    Only the member being parsed (plus at most one chunk) is buffered.
+    Raises ValueError if the document is not a well-formed JSON object.
+    """
+    decoder = codecs.getincrementaldecoder('utf-8')()
+    chunks = iter(chunks)
+    buffer = ''
+    pos = 0
+    exhausted = False
+    
+    def fill():
+        # Drop what was consumed and append the next chunk; False at end of stream
+        nonlocal buffer, pos, exhausted
+        if exhausted:
+            return False
+        chunk = next(chunks, None)
+        if chunk is None:
+            exhausted = True
+            buffer = buffer[pos:] + decoder.decode(b'', final=True)
+        else:
+            buffer = buffer[pos:] + decoder.decode(chunk)
+        pos = 0
+        return True
+    
+    def next_char():
+        # Next non-whitespace character (left at pos), reading more input as needed
+        nonlocal pos
+        while True:
+            pos = _skip_whitespace(buffer, pos)
+            if pos < len(buffer):
+                return buffer[pos]
+            if not fill():
+                raise ValueError("Unexpected end of feed")
+    
+    def next_value():
+        # Decode one JSON value; a value touching the end of the buffer may be cut off
+        nonlocal pos
+        next_char()
+        while True:
+            try:
+                value, end = _decoder.raw_decode(buffer, pos)
+                if end < len(buffer) or exhausted:
+                    pos = end
+                    return value
+            except json.JSONDecodeError:
+                if exhausted:
+                    raise ValueError(f"Malformed feed entry near: {buffer[pos:pos + 80]!r}")
+            fill()
+    
+    if next_char() != '{':
+        raise ValueError("Feed is not a JSON object")
+    pos += 1
+    
+    if next_char() == '}':
+        return
+    
+    while True:
+        key = next_value()
+        if not isinstance(key, str) or next_char() != ':':
+            raise ValueError("Malformed feed: expected a member name")
+        pos += 1
+        yield key, next_value()
+        
+        separator = next_char()
+        pos += 1
+        if separator == '}':
+            return
+        if separator != ',':
+            raise ValueError("Malformed feed: expected ',' or '}'")
\ No newline at end of file
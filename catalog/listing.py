@@ -0,0 +1,116 @@
+import base64
+import json
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+# Sort keys the listing API accepts, mapped to how each is read from a catalog record
+SORT_KEYS = ('name', 'added_at', 'last_update', 'metacritic')
+
+def _sort_value(game: Dict[str, Any], key: str) -> Optional[Any]:
+    if key == 'name':
+        return (game.get('name') or '').casefold() or None
+    if key == 'metacritic':
+        metacritic = game.get('metacritic')
+        score = metacritic.get('score') if isinstance(metacritic, dict) else None
+        return score if isinstance(score, (int, float)) else None
+    
+    # Dates: compare as ISO strings; unparseable values sort with the missing ones
+    value = game.get(key)
+    if not value:
+        return None
+    try:
+        return datetime.fromisoformat(str(value)[:19]).isoformat()
+    except ValueError:
+        return None
+
+class CatalogListing:
+    """Pre-sorted views of one catalog partition for cursor-paginated listing.
+    
+    Built once per catalog refresh. For every sort key and direction it keeps the
+    ordered list of game ids (games without a value for the key last) and each
+    id's position, so a page is a list slice and a cursor lookup is a dict hit.
+    """
+    
+    def __init__(self, games: Dict[str, Dict[str, Any]]):
+        self.games = games
+        self.orders = {}
+        self.positions = {}
+        
+        for key in SORT_KEYS:
+            valued = []
+            missing = []
+            for game_id, game in games.items():
+                value = _sort_value(game, key)
+                if value is None:
+                    missing.append(game_id)
+                else:
+                    valued.append((value, game_id))
+            
+            valued.sort()
+            missing.sort()
+            ascending = [game_id for _, game_id in valued] + missing
+            descending = [game_id for _, game_id in reversed(valued)] + missing
+            for direction, order in (('asc', ascending), ('desc', descending)):
+                self.orders[(key, direction)] = order
+                self.positions[(key, direction)] = {game_id: index for index, game_id in enumerate(order)}
+    
+    @staticmethod
+    def parse_sort(sort: Optional[str]) -> Optional[Tuple[str, str]]:
+        """'name' or '-metacritic' -> (key, direction); None for unknown keys"""
+        sort = (sort or 'name').strip()
+        direction = 'desc' if sort.startswith('-') else 'asc'
+        key = sort.lstrip('-')
+        return (key, direction) if key in SORT_KEYS else None
+    
+    def page(self, sort: Tuple[str, str], limit: int, cursor: Optional[str] = None,
+             fields: Optional[List[str]] = None) -> Dict[str, Any]:
+        order = self.orders[sort]
+        start = self._decode_cursor(sort, cursor)
+        game_ids = order[start:start + limit]
+        
+        items = []
+        for game_id in game_ids:
+            game = self.games[game_id]
+            if fields:
+                item = {field: game[field] for field in fields if field in game}
+                item.setdefault('id', game_id)
+            else:
+                item = game
+            items.append(item)
+        
+        end = start + len(game_ids)
+        return {
+            'items': items,
+            'total': len(order),
+            'next_cursor': self._encode_cursor(end, game_ids[-1]) if game_ids and end < len(order) else None
+        }
+    
+    @staticmethod
+    def _encode_cursor(offset: int, last_id: str) -> str:
+        raw = json.dumps([offset, last_id], separators=(',', ':')).encode('utf-8')
+        return base64.urlsafe_b64encode(raw).decode('ascii').rstrip('=')
+    
+    def _decode_cursor(self, sort: Tuple[str, str], cursor: Optional[str]) -> int:
+        """Resume after the cursor's last game; fall back to its offset if that game is gone"""
+        if not cursor:
+            return 0
+        try:
+            raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+            offset, last_id = json.loads(raw)
+            if not isinstance(offset, int) or isinstance(offset, bool) or not isinstance(last_id, str):
+                raise ValueError('Invalid cursor')
+        except (ValueError, TypeError):
+            raise ValueError('Invalid cursor')
+        
+        position = self.positions[sort].get(last_id)
+        return position + 1 if position is not None else max(offset, 0)
+
+def build_listings(free_games: Optional[Dict[str, Any]],
+                   premium_games: Optional[Dict[str, Any]]) -> Dict[str, CatalogListing]:
+    combined = dict(free_games or {})
+    combined.update(premium_games or {})
+    return {
+        'free': CatalogListing(free_games or {}),
+        'premium': CatalogListing(premium_games or {}),
+        'all': CatalogListing(combined)
+    }
\ No newline at end of file
@@ -0,0 +1,209 @@
+import heapq
+import re
+from collections import defaultdict
+from typing import Any, Dict, Iterable, List, Optional, Set
+
+_TOKEN_RE = re.compile(r'[^\W_]+', re.UNICODE)
+
+# Relevance of the ways a name can match the query (higher is better)
+SCORE_EXACT = 100
+SCORE_NAME_PREFIX = 80
+SCORE_TOKEN_PREFIX = 60
+SCORE_SUBSTRING = 40
+SCORE_FUZZY = 20
+
+def normalize(text: str) -> str:
+    return ' '.join(_TOKEN_RE.findall((text or '').casefold()))
+
+def tokenize(text: str) -> List[str]:
+    return _TOKEN_RE.findall((text or '').casefold())
+
+def trigrams(text: str) -> Set[str]:
+    return {text[i:i + 3] for i in range(len(text) - 2)}
+
+def max_typos(token: str) -> int:
+    """Edits tolerated for a query token: none for short tokens, more for long ones"""
+    if len(token) < 4:
+        return 0
+    return 1 if len(token) < 8 else 2
+
+def within_distance(a: str, b: str, limit: int) -> Optional[int]:
+    """Edit distance between a and b (adjacent swaps count as one edit) if at most limit, else None"""
+    if abs(len(a) - len(b)) > limit:
+        return None
+    before = None
+    previous = list(range(len(b) + 1))
+    for i in range(1, len(a) + 1):
+        current = [i] + [0] * len(b)
+        for j in range(1, len(b) + 1):
+            current[j] = min(previous[j] + 1, current[j - 1] + 1,
+                             previous[j - 1] + (a[i - 1] != b[j - 1]))
+            if i > 1 and j > 1 and a[i - 1] == b[j - 2] and a[i - 2] == b[j - 1]:
+                current[j] = min(current[j], before[j - 2] + 1)
+        if min(current) > limit:
+            return None
+        before, previous = previous, current
+    return previous[-1] if previous[-1] <= limit else None
+
+def _intersect(postings: Iterable[Set[int]]) -> Set[int]:
+    postings = sorted(postings, key=len)
+    if not postings:
+        return set()
+    result = set(postings[0])
+    for posting in postings[1:]:
+        result &= posting
+        if not result:
+            break
+    return result
+
+class SearchIndex:
+    """Inverted index over game names and genres for /api/games/search.
+    
+    Built once per catalog refresh:
+    - name trigram postings, to find substring matches without scanning names
+      (1-2 character postings for queries too short for trigrams)
+    - token postings and token trigrams, for prefix and typo-tolerant matches
+    - genre and access posting lists, intersected with the name matches
+    Each game also gets its search result record precomputed.
+    """
+    
+    def __init__(self, free_games: Dict[str, Dict[str, Any]], premium_games: Dict[str, Dict[str, Any]]):
+        self.names = []
+        self.results = []
+        self.name_grams = defaultdict(set)
+        self.token_docs = defaultdict(set)
+        self.token_grams = defaultdict(set)
+        self.short_gram_docs = defaultdict(set)
+        self.short_prefix_docs = defaultdict(set)
+        self.genre_docs = defaultdict(set)
+        self.access_docs = {'free': set(), 'premium': set()}
+        self.all_docs = set()
+        
+        for access, games in (('free', free_games or {}), ('premium', premium_games or {})):
+            for game_id, game in games.items():
+                self._add(game_id, game, access)
+    
+    def _add(self, game_id: str, game: Dict[str, Any], access: str) -> None:
+        doc = len(self.names)
+        genres = [g.get('description') for g in game.get('genres') or [] if isinstance(g, dict)]
+        name = normalize(game.get('name', ''))
+        
+        self.names.append(name)
+        self.results.append({
+            'id': game_id,
+            'name': game.get('name', 'Unknown'),
+            'image': game.get('image', ''),
+            'release_date': game.get('release_date', ''),
+            'genres': genres,
+            'access': access
+        })
+        self.all_docs.add(doc)
+        self.access_docs[access].add(doc)
+        
+        for gram in trigrams(name):
+            self.name_grams[gram].add(doc)
+        # Queries too short for trigrams still match any substring of the name
+        for length in (1, 2):
+            for i in range(len(name) - length + 1):
+                self.short_gram_docs[name[i:i + length]].add(doc)
+        for token in set(name.split()):
+            if token not in self.token_docs:
+                for gram in trigrams(token):
+                    self.token_grams[gram].add(token)
+            self.token_docs[token].add(doc)
+            # Short query tokens of the fuzzy fallback match 1-2 character token prefixes
+            for length in (1, 2):
+                if len(token) >= length:
+                    self.short_prefix_docs[token[:length]].add(doc)
+        for genre in genres:
+            if genre:
+                self.genre_docs[genre.casefold()].add(doc)
+    
+    def genres(self) -> List[str]:
+        return sorted(self.genre_docs)
+    
+    def search(self, query: str = '', access: str = 'all', genre: str = '', limit: int = 50) -> List[Dict[str, Any]]:
+        """Top `limit` results, best match first, then by name"""
+        candidates = self.all_docs if access == 'all' else self.access_docs.get(access, set())
+        if genre:
+            candidates = candidates & self.genre_docs.get(genre.casefold(), set())
+        if not candidates:
+            return []
+        
+        normalized = normalize(query)
+        if not normalized:
+            scored = ((0, doc) for doc in candidates)
+        else:
+            scores = self._match(normalized, candidates)
+            scored = ((score, doc) for doc, score in scores.items())
+        
+        top = heapq.nsmallest(limit, scored, key=lambda item: (-item[0], self.names[item[1]]))
+        return [self.results[doc] for _, doc in top]
+    
+    def _match(self, query: str, candidates: Set[int]) -> Dict[int, int]:
+        scores = {}
+        
+        # Substring matches: candidates share every trigram of the query, then verify
+        if len(query) >= 3:
+            docs = _intersect(self.name_grams.get(gram, set()) for gram in trigrams(query)) & candidates
+        else:
+            docs = self.short_gram_docs.get(query, set()) & candidates
+        
+        for doc in docs:
+            name = self.names[doc]
+            if name == query:
+                scores[doc] = SCORE_EXACT
+            elif name.startswith(query):
+                scores[doc] = SCORE_NAME_PREFIX
+            elif (' ' + name).find(' ' + query) >= 0:
+                scores[doc] = SCORE_TOKEN_PREFIX
+            elif query in name:
+                scores[doc] = SCORE_SUBSTRING
+        
+        if scores:
+            return scores
+        
+        # Nothing matched verbatim: every query token must match some name token
+        # by prefix, allowing a few typos
+        token_matches = []
+        for token in query.split():
+            matched = self._fuzzy_token_docs(token)
+            if not matched:
+                return {}
+            token_matches.append(matched)
+        
+        docs = _intersect(set(matched) for matched in token_matches) & candidates
+        for doc in docs:
+            distance = sum(matched[doc] for matched in token_matches)
+            scores[doc] = SCORE_FUZZY - distance
+        return scores
+    
+    def _fuzzy_token_docs(self, token: str) -> Dict[int, int]:
+        """Docs with a name token that starts with `token` give or take max_typos edits -> fewest edits"""
+        if len(token) < 3:
+            return dict.fromkeys(self.short_prefix_docs.get(token, ()), 0)
+        
+        limit = max_typos(token)
+        vocabulary = set()
+        for gram in trigrams(token):
+            vocabulary |= self.token_grams.get(gram, set())
+        
+        docs = {}
+        for candidate in vocabulary:
+            if candidate.startswith(token):
+                distance = 0
+            elif not limit:
+                continue
+            else:
+                # Compare with the candidate's prefix of (about) the query's length
+                distance = None
+                for length in range(max(len(token) - limit, 1), len(token) + limit + 1):
+                    found = within_distance(token, candidate[:length], limit)
+                    if found is not None and (distance is None or found < distance):
+                        distance = found
+                if distance is None:
+                    continue
+            for doc in self.token_docs[candidate]:
+                if doc not in docs or distance < docs[doc]:
+                    docs[doc] = distance
+        return docs
\ No newline at end of file
@@ -0,0 +1,110 @@
+import hashlib
+import heapq
+from types import MappingProxyType
+from typing import Any, Dict, Optional, Tuple
+
+from .encoded import EncodedPayload, encode_catalog
+from .listing import build_listings
+from .search import SearchIndex
+
+# How many games /api/games/stats lists as recently added
+RECENTLY_ADDED_LIMIT = 10
+
+PLATFORMS = ('windows', 'mac', 'linux')
+
+class CatalogSnapshot:
+    """One immutable catalog version together with every view derived from it.
+    
+    Everything the games endpoints serve (encoded responses, sorted listings,
+    the search index, stats and genre facets) is computed here once per
+    catalog refresh, in a single pass over both partitions where possible.
+    A snapshot is fully built before it is published and never changes
+    afterwards, so a reader holding one sees a consistent catalog without
+    locking; a refresh publishes a new snapshot instead of updating this one.
+    
+    The version is derived from the catalog content, so every worker serving
+    the same catalog reports the same version.
+    """
+    
+    def __init__(self, free_games: Optional[Dict[str, Any]],
+                 premium_games: Optional[Dict[str, Any]], fetched_at: float):
+        self.encoded = encode_catalog(free_games, premium_games)
+        self.listings = build_listings(free_games, premium_games)
+        self.search = SearchIndex(free_games, premium_games)
+        
+        self.free_games = MappingProxyType(free_games or {})
+        self.premium_games = MappingProxyType(premium_games or {})
+        self.fetched_at = fetched_at
+        self.version = hashlib.sha1(
+            (self.encoded['free'].etag + self.encoded['premium'].etag).encode('ascii')
+        ).hexdigest()[:16]
+        
+        self.stats = self._compute_stats()
+        self.genre_facets = self.stats["genre_facets"]
+        self.encoded_stats = EncodedPayload.from_object(self.stats)
+        self._frozen = True
+    
+    def __setattr__(self, name: str, value: Any):
+        if getattr(self, '_frozen', False):
+            raise AttributeError(f"CatalogSnapshot is immutable (cannot set {name})")
+        super().__setattr__(name, value)
+    
+    def find_game(self, game_id: str) -> Tuple[Optional[Dict[str, Any]], Optional[str]]:
+        """A game and its access type, looked up in both partitions"""
+        if game_id in self.free_games:
+            return self.free_games[game_id], "free"
+        if game_id in self.premium_games:
+            return self.premium_games[game_id], "premium"
+        return None, None
+    
+    def _compute_stats(self) -> Dict[str, Any]:
+        genres = {}
+        platforms = dict.fromkeys(PLATFORMS, 0)
+        added = []
+        
+        for access, games in (('free', self.free_games), ('premium', self.premium_games)):
+            for game_id, game_data in games.items():
+                for genre in game_data.get("genres") or []:
+                    genre_name = genre.get("description")
+                    if genre_name:
+                        genres[genre_name] = genres.get(genre_name, 0) + 1
+                
+                game_platforms = game_data.get("platforms") or {}
+                for platform in PLATFORMS:
+                    if game_platforms.get(platform):
+                        platforms[platform] += 1
+                
+                if game_data.get("added_at"):
+                    added.append((game_id, game_data, access))
+        
+        # Top-k by added_at without sorting the whole catalog
+        recently_added = [
+            {
+                "id": game_id,
+                "name": game_data.get("name", "Unknown"),
+                "added_at": game_data.get("added_at"),
+                "access": access
+            }
+            for game_id, game_data, access in heapq.nlargest(
+                RECENTLY_ADDED_LIMIT, added, key=lambda entry: entry[1].get("added_at", "")
+            )
+        ]
+        
+        # Most popular genres first; the JSON object loses this order, the list keeps it
+        genre_facets = [
+            {"name": name, "count": count}
+            for name, count in sorted(genres.items(), key=lambda item: item[1], reverse=True)
+        ]
+        
+        free_count = len(self.free_games)
+        premium_count = len(self.premium_games)
+        return {
+            "total_games": free_count + premium_count,
+            "free_games": free_count,
+            "premium_games": premium_count,
+            "genres": {facet["name"]: facet["count"] for facet in genre_facets},
+            "genre_facets": genre_facets,
+            "platforms": platforms,
+            "recently_added": recently_added,
+            "last_updated": self.fetched_at
+        }
\ No newline at end of file
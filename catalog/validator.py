@@ -0,0 +1,122 @@
+import re
+import threading
+from typing import Any, Dict, Iterable, List, Optional, Pattern
+
+# Names of placeholder entries the upstream feed carries instead of real games.
+# Each rule must match the whole (stripped) name; rule names become regex group names.
+DEFAULT_PLACEHOLDER_RULES = [
+    {"name": "game_number", "pattern": r"GAME\s+\d+", "ignore_case": False},  # "GAME XX"
+    {"name": "placeholder", "pattern": r"PLACEHOLDER\s*\d*", "ignore_case": True},  # "PLACEHOLDER" or "PLACEHOLDER XX"
+    {"name": "test", "pattern": r"TEST\s*\d*", "ignore_case": True},  # "TEST" or "TEST XX"
+    {"name": "untitled", "pattern": r"UNTITLED\s*\d*", "ignore_case": True},  # "UNTITLED" or "UNTITLED XX"
+    {"name": "unknown", "pattern": r"UNKNOWN\s*\d*", "ignore_case": True},  # "UNKNOWN" or "UNKNOWN XX"
+    {"name": "unnamed", "pattern": r"UNNAMED\s*\d*", "ignore_case": True},  # "UNNAMED" or "UNNAMED XX"
+    {"name": "temp", "pattern": r"TEMP\s*\d*", "ignore_case": True}  # "TEMP" or "TEMP XX"
+]
+
+# Rejection reasons that are not placeholder rules
+INVALID_ENTRY = 'invalid_entry'
+MISSING_NAME = 'missing_name'
+
+def compile_rules(rules: Iterable[Dict[str, Any]]) -> Pattern:
+    """Merge placeholder rules into one alternation of named groups (matched against whole names).
+    
+    Raises ValueError for a malformed rule set.
+    """
+    alternatives = []
+    names = set()
+    for rule in rules:
+        name = rule.get("name")
+        if not isinstance(name, str) or not name.isidentifier():
+            raise ValueError(f"Invalid rule name: {name!r}")
+        if name in names or name in (INVALID_ENTRY, MISSING_NAME):
+            raise ValueError(f"Duplicate rule name: {name}")
+        names.add(name)
+        
+        pattern = rule.get("pattern")
+        try:
+            re.compile(pattern)
+        except (re.error, TypeError) as e:
+            raise ValueError(f"Invalid pattern for rule {name}: {e}")
+        flags = '(?i:' if rule.get("ignore_case", True) else '(?:'
+        alternatives.append(f"(?P<{name}>{flags}{pattern}))")
+    
+    if not alternatives:
+        # Matches nothing: every named entry is accepted
+        return re.compile(r'(?!)')
+    return re.compile('|'.join(alternatives))
+
+class CatalogValidator:
+    """Filters placeholder and nameless entries out of catalog sources.
+    
+    All rules are tested with a single precompiled regex; the named group that
+    matched tells which rule rejected a game. Rejections are counted per rule
+    and per source (feed, backup files, MongoDB). Rules can be replaced at
+    runtime; the new regex is compiled first and then swapped in.
+    """
+    
+    def __init__(self, rules: Optional[List[Dict[str, Any]]] = None):
+        self._lock = threading.Lock()
+        self._rules = []
+        self._pattern = None
+        self._accepted = {}
+        self._rejected = {}
+        self.set_rules(DEFAULT_PLACEHOLDER_RULES if rules is None else rules)
+    
+    @property
+    def rules(self) -> List[Dict[str, Any]]:
+        return [dict(rule) for rule in self._rules]
+    
+    def set_rules(self, rules: List[Dict[str, Any]]) -> None:
+        rules = [
+            {"name": rule.get("name"), "pattern": rule.get("pattern"), "ignore_case": bool(rule.get("ignore_case", True))}
+            for rule in rules
+        ]
+        pattern = compile_rules(rules)
+        self._rules, self._pattern = rules, pattern
+    
+    def rejection_reason(self, game_data: Any) -> Optional[str]:
+        """Why a catalog entry is rejected (a rule name), or None if it is kept"""
+        if not isinstance(game_data, dict):
+            return INVALID_ENTRY
+        name = game_data.get('name')
+        name = name.strip() if isinstance(name, str) else ''
+        if not name:
+            return MISSING_NAME
+        match = self._pattern.fullmatch(name)
+        return match.lastgroup if match else None
+    
+    def check(self, game_data: Any, source: str) -> Optional[str]:
+        """rejection_reason() that also updates the counters of the given source"""
+        reason = self.rejection_reason(game_data)
+        with self._lock:
+            if reason is None:
+                self._accepted[source] = self._accepted.get(source, 0) + 1
+            else:
+                rejected = self._rejected.setdefault(source, {})
+                rejected[reason] = rejected.get(reason, 0) + 1
+        return reason
+    
+    def filter_games(self, games: Dict[str, Any], source: str) -> Dict[str, Any]:
+        """The entries of a {game_id: game_data} mapping that pass validation"""
+        return {game_id: game_data for game_id, game_data in games.items()
+                if self.check(game_data, source) is None}
+    
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            rejected = {source: dict(counts) for source, counts in self._rejected.items()}
+            accepted = dict(self._accepted)
+        
+        by_rule = {}
+        for counts in rejected.values():
+            for reason, count in counts.items():
+                by_rule[reason] = by_rule.get(reason, 0) + count
+        return {
+            'rules': [rule["name"] for rule in self._rules],
+            'accepted': accepted,
+            'rejected': rejected,
+            'rejected_by_rule': by_rule
+        }
+
+# Global instance
+catalog_validator = CatalogValidator()
\ No newline at end of file
@@ -1,5 +1,7 @@
 from datetime import datetime
 from typing import Dict, Any, List
+import hashlib
+import json
 
 class Game:
     def __init__(self, data: Dict[str, Any] = None):
@@ -17,6 +19,9 @@ class Game:
         self.developer = data.get('developer', '')
         self.release_date = data.get('release_date', '')
         self.rating = data.get('rating', 0.0)
+        # Upstream catalog record as served by the games API, and its fingerprint
+        self.data = data.get('data', {})
+        self.content_hash = data.get('content_hash', '')
     
     def to_dict(self) -> Dict[str, Any]:
         return {
@@ -30,9 +35,29 @@ class Game:
             'description': self.description,
             'developer': self.developer,
             'release_date': self.release_date,
-            'rating': self.rating
+            'rating': self.rating,
+            'data': self.data,
+            'content_hash': self.content_hash
         }
     
     @classmethod
     def from_dict(cls, data: Dict[str, Any]) -> 'Game':
-        return cls(data)
\ No newline at end of file
+        return cls(data)
+    
+    @staticmethod
+    def compute_hash(data: Dict[str, Any]) -> str:
+        return hashlib.sha1(json.dumps(data, sort_keys=True, ensure_ascii=False).encode('utf-8')).hexdigest()
+    
+    @classmethod
+    def from_catalog_entry(cls, game_id: str, access_type: str, data: Dict[str, Any]) -> 'Game':
+        """Build a game from one record of the upstream catalog feed"""
+        return cls({
+            'game_id': game_id,
+            'name': data.get('name', ''),
+            'access_type': access_type,
+            'icon': data.get('image', ''),
+            'release_date': data.get('release_date', ''),
+            'categories': data.get('genres', []),
+            'data': data,
+            'content_hash': cls.compute_hash(data)
+        })
\ No newline at end of file
@@ -0,0 +1,65 @@
+from datetime import datetime
+import uuid
+from typing import Dict, Any
+
+class GameSession:
+    def __init__(self, data: Dict[str, Any] = None):
+        if data is None:
+            data = {}
+        
+        now = datetime.now()
+        self.session_id = data.get('session_id', str(uuid.uuid4()))
+        self.user_id = data.get('user_id', '')
+        self.game_id = data.get('game_id', '')
+        self.game_name = data.get('game_name', '')
+        self.game_image = data.get('game_image', '')
+        self.timestamp = data.get('timestamp', now.strftime('%Y-%m-%d %H:%M:%S'))
+        self.duration = data.get('duration', '0h 0m')
+        self.duration_minutes = data.get('duration_minutes', 0)
+        self.date = data.get('date', now.strftime('%Y-%m-%d'))
+    
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'session_id': self.session_id,
+            'user_id': self.user_id,
+            'game_id': self.game_id,
+            'game_name': self.game_name,
+            'game_image': self.game_image,
+            'timestamp': self.timestamp,
+            'duration': self.duration,
+            'duration_minutes': self.duration_minutes,
+            'date': self.date
+        }
+    
+    def to_summary(self) -> Dict[str, Any]:
+        """The fields kept on the user document as last_session"""
+        return {
+            'game_id': self.game_id,
+            'game_name': self.game_name,
+            'game_image': self.game_image,
+            'timestamp': self.timestamp,
+            'duration': self.duration,
+            'date': self.date
+        }
+    
+    @staticmethod
+    def legacy_session_id(user_id: str, index: int) -> str:
+        """Stable id of the index-th entry of a user's embedded game_sessions array"""
+        return str(uuid.uuid5(uuid.NAMESPACE_OID, f"game_session:{user_id}:{index}"))
+    
+    @staticmethod
+    def parse_duration(text: str) -> int:
+        """Minutes in an "Xh Ym" duration string; 0 if it cannot be parsed"""
+        try:
+            hours, minutes = (text or "0h 0m").split('h ')
+            return int(hours) * 60 + int(minutes.replace('m', ''))
+        except (ValueError, AttributeError):
+            return 0
+    
+    @staticmethod
+    def format_duration(minutes: int) -> str:
+        return f"{minutes // 60}h {minutes % 60}m"
+    
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> 'GameSession':
+        return cls(data)
\ No newline at end of file
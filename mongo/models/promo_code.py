@@ -8,7 +8,7 @@ class PromoCode:
             data = {}
         
         self.id = data.get('id', str(uuid.uuid4()))
-        self.code = data.get('code', '')
+        self.code = self.normalize_code(data.get('code', ''))
         self.description = data.get('description', '')
         self.uses_limit = data.get('uses_limit', 1)
         self.uses_count = data.get('uses_count', 0)
@@ -16,8 +16,11 @@ class PromoCode:
         self.gives_premium = data.get('gives_premium', False)
         self.premium_duration = data.get('premium_duration', 0)
         self.slots = data.get('slots', 0)
+        self.slots_duration = data.get('slots_duration', '3')
         self.created_at = data.get('created_at', datetime.now().isoformat())
+        self.created_by = data.get('created_by', '')
         self.used_by = data.get('used_by', [])
+        self.redeemed_by = data.get('redeemed_by', [])
         self.group = data.get('group', '')
     
     def to_dict(self) -> Dict[str, Any]:
@@ -31,8 +34,11 @@ class PromoCode:
             'gives_premium': self.gives_premium,
             'premium_duration': self.premium_duration,
             'slots': self.slots,
+            'slots_duration': self.slots_duration,
             'created_at': self.created_at,
+            'created_by': self.created_by,
             'used_by': self.used_by,
+            'redeemed_by': self.redeemed_by,
             'group': self.group
         }
     
@@ -40,6 +46,11 @@ class PromoCode:
     def from_dict(cls, data: Dict[str, Any]) -> 'PromoCode':
         return cls(data)
     
+    @staticmethod
+    def normalize_code(code: str) -> str:
+        """Canonical form used for storing and looking up promo codes"""
+        return (code or '').strip().upper()
+    
     def is_expired(self) -> bool:
         if not self.expires_at:
             return False
@@ -0,0 +1,80 @@
+from datetime import datetime
+import uuid
+from typing import Dict, Any, Optional
+
+class Slot:
+    """One friend slot: owned by user_id, optionally assigned to a friend (by username)"""
+    
+    def __init__(self, data: Dict[str, Any] = None):
+        if data is None:
+            data = {}
+        
+        timestamp = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+        self.slot_id = data.get('slot_id', str(uuid.uuid4()))
+        self.user_id = data.get('user_id', '')
+        self.position = data.get('position', 0)
+        self.source = data.get('source')
+        self.created_at = data.get('created_at', timestamp)
+        self.expires_at = data.get('expires_at')
+        self.expired_at = data.get('expired_at')
+        self.assigned_to = data.get('assigned_to')
+        self.users_history = data.get('users_history', [])
+        self.last_removal_time = data.get('last_removal_time')
+        self.last_update = data.get('last_update', timestamp)
+    
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'slot_id': self.slot_id,
+            'user_id': self.user_id,
+            'position': self.position,
+            'source': self.source,
+            'created_at': self.created_at,
+            'expires_at': self.expires_at,
+            'expired_at': self.expired_at,
+            'assigned_to': self.assigned_to,
+            'users_history': self.users_history,
+            'last_removal_time': self.last_removal_time,
+            'last_update': self.last_update
+        }
+    
+    def expiry(self) -> Optional[datetime]:
+        """When the slot expires, None if it is permanent (or the date cannot be parsed)"""
+        if not self.expires_at:
+            return None
+        try:
+            return datetime.strptime(self.expires_at, '%Y-%m-%d %H:%M:%S')
+        except (TypeError, ValueError):
+            return None
+    
+    def is_expired(self, now: datetime = None) -> bool:
+        if self.expired_at:
+            return True
+        expiry = self.expiry()
+        return expiry is not None and (now or datetime.now()) > expiry
+    
+    def released_history(self, username: str, status: str, timestamp: str) -> list:
+        """users_history with the active entry of username closed as status"""
+        history = []
+        for entry in self.users_history:
+            if entry.get('username') == username and entry.get('status') == 'active':
+                entry = dict(entry, status=status, removed_at=timestamp)
+            history.append(entry)
+        return history
+    
+    @staticmethod
+    def legacy_slot_id(user_id: str, position: int) -> str:
+        """Stable id of a migrated embedded slot without one of its own"""
+        return str(uuid.uuid5(uuid.NAMESPACE_OID, f"slot:{user_id}:{position}"))
+    
+    @staticmethod
+    def free_filter(now: str) -> Dict[str, Any]:
+        """Query conditions of a slot that is unassigned and not expired at now ('%Y-%m-%d %H:%M:%S')"""
+        return {
+            "assigned_to": None,
+            "expired_at": None,
+            "$or": [{"expires_at": None}, {"expires_at": {"$gt": now}}]
+        }
+    
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> 'Slot':
+        return cls(data)
\ No newline at end of file
@@ -1,8 +1,12 @@
 from datetime import datetime, date
 import uuid
 from typing import Optional, List, Dict, Any
+from .game_session import GameSession
 
 class User:
+    # Every status a user document can hold
+    STATUSES = ('Standard', 'Premium', 'Premium (Aligned)', 'Admin')
+    
     def __init__(self, data: Dict[str, Any] = None, **kwargs):
         if data is None:
             data = {}
@@ -19,6 +23,11 @@ class User:
         self.games_count = data.get('games_count', 0)
         self.is_admin = data.get('is_admin', False)
         self.premium_expires = data.get('premium_expires')
+        self.premium_expires_at = data.get('premium_expires_at')
+        # BSON date copy of premium_expires_at, indexed for the expiry scheduler
+        self.premium_expiry = self.parse_expiry(self.premium_expires_at)
+        self.premium_source = data.get('premium_source')
+        self.premium_history = data.get('premium_history', [])
         self.slots = data.get('slots', 1)
         self.devices = data.get('devices', [])
         self.referral_code = data.get('referral_code', '')
@@ -32,13 +41,22 @@ class User:
         self.launcher_connected = data.get('launcher_connected', False)
         self.last_connection = data.get('last_connection')
         self.unique_id = data.get('unique_id')
-        self.total_play_time = data.get('total_play_time', '0h 0m')
+        # total_play_minutes is the stored counter; the "Xh Ym" text is derived from it
+        self.total_play_minutes = data.get('total_play_minutes', GameSession.parse_duration(data.get('total_play_time')))
+        self.total_play_time = GameSession.format_duration(self.total_play_minutes)
         self.games_played = data.get('games_played', 0)
         self.achievements = data.get('achievements', 0)
         self.last_session = data.get('last_session')
-        self.game_sessions = data.get('game_sessions', [])
-        self.friends = data.get('friends', [])
+        # Next free slot position (UserOperations.allocate_slot_positions); the slots,
+        # and who is aligned through them, live in the slots collection
+        self.slot_positions = data.get('slot_positions', 0)
+        self.aligned_by = data.get('aligned_by')
         self.active_devices = data.get('active_devices', [])
+        self.primary_device = data.get('primary_device')
+        self.last_connected_device = data.get('last_connected_device')
+        self.device_reset_history = data.get('device_reset_history', [])
+        # Incremented by every write (UserOperations._versioned)
+        self.version = data.get('version', 0)
     
     def to_dict(self) -> Dict[str, Any]:
         return {
@@ -51,6 +69,10 @@ class User:
             'games_count': self.games_count,
             'is_admin': self.is_admin,
             'premium_expires': self.premium_expires,
+            'premium_expires_at': self.premium_expires_at,
+            'premium_expiry': self.premium_expiry,
+            'premium_source': self.premium_source,
+            'premium_history': self.premium_history,
             'slots': self.slots,
             'devices': self.devices,
             'referral_code': self.referral_code,
@@ -64,18 +86,40 @@ class User:
             'last_connection': self.last_connection,
             'unique_id': self.unique_id,
             'total_play_time': self.total_play_time,
+            'total_play_minutes': self.total_play_minutes,
             'games_played': self.games_played,
             'achievements': self.achievements,
             'last_session': self.last_session,
-            'game_sessions': self.game_sessions,
-            'friends': self.friends,
-            'active_devices': self.active_devices
+            'slot_positions': self.slot_positions,
+            'aligned_by': self.aligned_by,
+            'active_devices': self.active_devices,
+            'primary_device': self.primary_device,
+            'last_connected_device': self.last_connected_device,
+            'device_reset_history': self.device_reset_history,
+            'version': self.version
         }
     
     @classmethod
     def from_dict(cls, data: Dict[str, Any]) -> 'User':
         return cls(data)
     
+    @staticmethod
+    def parse_expiry(value: Optional[str]) -> Optional[datetime]:
+        """premium_expires_at ('%Y-%m-%d %H:%M:%S', local time) as a datetime, None if unset or invalid"""
+        if not value:
+            return None
+        try:
+            return datetime.strptime(value, '%Y-%m-%d %H:%M:%S')
+        except (TypeError, ValueError):
+            return None
+    
+    @classmethod
+    def normalize_status(cls, value: Optional[str]) -> Optional[str]:
+        """The stored spelling of a status name given in any case, None if it is not a status"""
+        if not isinstance(value, str):
+            return None
+        return next((status for status in cls.STATUSES if status.lower() == value.strip().lower()), None)
+    
     def is_premium(self) -> bool:
         if not self.premium_expires:
             return False
@@ -0,0 +1,93 @@
+from typing import Any, Callable, Dict, Optional
+from datetime import datetime
+import os
+import socket
+import threading
+from pymongo import CursorType
+from pymongo.errors import CollectionInvalid
+from ..connection import mongo_db
+import logging
+
+logger = logging.getLogger(__name__)
+
+class CacheBusOperations:
+    """Cache invalidation events shared by all app processes through a capped collection.
+    
+    Every process publishes the invalidations it applied locally and tails the
+    collection to apply the ones published by the others.
+    """
+    COLLECTION_NAME = 'cache_events'
+    CAPPED_SIZE = 1024 * 1024  # 1 MB
+    CAPPED_MAX = 10000
+    
+    def __init__(self):
+        self.collection = mongo_db.db[self.COLLECTION_NAME]
+    
+    @property
+    def origin(self) -> str:
+        # Resolved per call: gunicorn workers fork after import
+        return f"{socket.gethostname()}:{os.getpid()}"
+    
+    def ensure_collection(self) -> bool:
+        try:
+            mongo_db.db.create_collection(self.COLLECTION_NAME, capped=True,
+                                          size=self.CAPPED_SIZE, max=self.CAPPED_MAX)
+            logger.info(f"Created capped collection {self.COLLECTION_NAME}")
+            return True
+        except CollectionInvalid:
+            # Already exists
+            return True
+        except Exception as e:
+            logger.error(f"Error creating capped collection {self.COLLECTION_NAME}: {e}")
+            return False
+    
+    def publish(self, channel: str, key: Optional[str] = None, payload: Optional[Dict[str, Any]] = None) -> bool:
+        try:
+            self.collection.insert_one({
+                "channel": channel,
+                "key": key,
+                "payload": payload or {},
+                "origin": self.origin,
+                "created_at": datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+            })
+            return True
+        except Exception as e:
+            logger.error(f"Error publishing cache event {channel}/{key}: {e}")
+            return False
+    
+    def listen(self, handler: Callable[[Dict[str, Any]], None],
+               stop_event: Optional[threading.Event] = None, retry_interval: float = 1.0) -> None:
+        """Tail the event collection and call handler for events from other processes.
+        
+        Starts after the newest existing event, resumes after the last seen one when
+        the tailable cursor dies (e.g. on an empty collection) and retries on errors.
+        Blocks until stop_event is set.
+        """
+        stop_event = stop_event or threading.Event()
+        last_id = None
+        try:
+            latest = self.collection.find_one({}, {"_id": 1}, sort=[("$natural", -1)])
+            last_id = latest["_id"] if latest else None
+        except Exception as e:
+            logger.error(f"Error reading latest cache event: {e}")
+        
+        while not stop_event.is_set():
+            try:
+                query = {"_id": {"$gt": last_id}} if last_id is not None else {}
+                cursor = self.collection.find(query, cursor_type=CursorType.TAILABLE_AWAIT)
+                while cursor.alive and not stop_event.is_set():
+                    for event in cursor:
+                        last_id = event["_id"]
+                        if event.get("origin") == self.origin:
+                            continue
+                        try:
+                            handler(event)
+                        except Exception as e:
+                            logger.error(f"Error handling cache event {event.get('channel')}: {e}")
+            except Exception as e:
+                logger.error(f"Error tailing cache events: {e}")
+            
+            stop_event.wait(retry_interval)
+
+# Global instance
+cache_bus_ops = CacheBusOperations()
\ No newline at end of file
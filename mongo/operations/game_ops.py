@@ -1,4 +1,5 @@
 from typing import List, Optional, Dict, Any
+from pymongo import UpdateOne, DeleteMany
 from ..connection import mongo_db
 from ..models.game import Game
 import logging
@@ -23,24 +24,71 @@ class GameOperations:
     
     def upsert_games_bulk(self, games: List[Game]) -> int:
         try:
-            operations = []
-            for game in games:
-                operations.append({
-                    "updateOne": {
-                        "filter": {"game_id": game.game_id},
-                        "update": {"$set": game.to_dict()},
-                        "upsert": True
-                    }
-                })
+            operations = [
+                UpdateOne({"game_id": game.game_id}, {"$set": game.to_dict()}, upsert=True)
+                for game in games
+            ]
             
             if operations:
-                result = self.collection.bulk_write(operations)
+                result = self.collection.bulk_write(operations, ordered=False)
                 return result.upserted_count + result.modified_count
             return 0
         except Exception as e:
             logger.error(f"Error bulk upserting games: {e}")
             return 0
     
+    def get_content_hashes(self) -> Dict[str, str]:
+        try:
+            cursor = self.collection.find({}, {"_id": 0, "game_id": 1, "content_hash": 1})
+            return {data["game_id"]: data.get("content_hash", "") for data in cursor}
+        except Exception as e:
+            logger.error(f"Error getting game content hashes: {e}")
+            return {}
+    
+    def sync_catalog(self, games: List[Game]) -> Optional[Dict[str, int]]:
+        """Make the collection match the given catalog in one unordered bulk write.
+        
+        Only games whose content hash changed are written, and games missing from
+        the catalog are deleted. Returns the write counts, or None on failure.
+        """
+        try:
+            stored = self.get_content_hashes()
+            operations = [
+                UpdateOne({"game_id": game.game_id}, {"$set": game.to_dict()}, upsert=True)
+                for game in games
+                if stored.get(game.game_id) != game.content_hash
+            ]
+            counts = {"upserted": 0, "modified": 0, "deleted": 0, "unchanged": len(games) - len(operations)}
+            
+            current_ids = {game.game_id for game in games}
+            removed_ids = [game_id for game_id in stored if game_id not in current_ids]
+            if removed_ids:
+                operations.append(DeleteMany({"game_id": {"$in": removed_ids}}))
+            
+            if operations:
+                result = self.collection.bulk_write(operations, ordered=False)
+                counts.update(upserted=result.upserted_count, modified=result.modified_count,
+                              deleted=result.deleted_count)
+            
+            logger.info(f"Games catalog synced: {counts}")
+            return counts
+        except Exception as e:
+            logger.error(f"Error syncing games catalog: {e}")
+            return None
+    
+    def load_catalog(self) -> Dict[str, Dict[str, Dict[str, Any]]]:
+        """The persisted catalog as {access_type: {game_id: upstream record}}"""
+        catalog = {"free": {}, "premium": {}}
+        try:
+            cursor = self.collection.find({}, {"_id": 0, "game_id": 1, "access_type": 1, "data": 1})
+            for data in cursor:
+                if data.get("access_type") in catalog and data.get("data"):
+                    catalog[data["access_type"]][data["game_id"]] = data["data"]
+            return catalog
+        except Exception as e:
+            logger.error(f"Error loading games catalog: {e}")
+            return catalog
+    
     def get_game_by_id(self, game_id: str) -> Optional[Game]:
         try:
             data = self.collection.find_one({"game_id": game_id})
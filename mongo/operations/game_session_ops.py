@@ -0,0 +1,124 @@
+from typing import List, Dict, Any
+from pymongo import UpdateOne
+from pymongo.errors import DuplicateKeyError
+from ..connection import mongo_db
+from ..models.game_session import GameSession
+import logging
+
+logger = logging.getLogger(__name__)
+
+class GameSessionOperations:
+    """Append-only play sessions, one document per session, indexed by (user_id, timestamp).
+    
+    played_games holds one marker per (user_id, game_id); the upsert that
+    creates it is what tells a user's first session of a game.
+    """
+    
+    def __init__(self):
+        self.collection = mongo_db.db.game_sessions
+        self.played = mongo_db.db.played_games
+    
+    def ensure_indexes(self) -> None:
+        try:
+            self.collection.create_index("session_id", unique=True)
+            self.collection.create_index([("user_id", 1), ("timestamp", -1)])
+            self.collection.create_index([("user_id", 1), ("game_id", 1)])
+            self.played.create_index([("user_id", 1), ("game_id", 1)], unique=True)
+        except Exception as e:
+            logger.warning(f"Could not ensure game session indexes: {e}")
+    
+    def record_session(self, session: GameSession) -> bool:
+        try:
+            self.collection.insert_one(session.to_dict())
+            return True
+        except Exception as e:
+            logger.error(f"Error recording game session for user {session.user_id}: {e}")
+            return False
+    
+    def get_sessions_by_user(self, user_id: str, limit: int = 20, skip: int = 0) -> List[GameSession]:
+        """Most recent sessions first"""
+        try:
+            cursor = (self.collection.find({"user_id": user_id}, {"_id": 0})
+                      .sort("timestamp", -1)
+                      .skip(skip)
+                      .limit(limit))
+            return [GameSession.from_dict(data) for data in cursor]
+        except Exception as e:
+            logger.error(f"Error getting game sessions for user {user_id}: {e}")
+            return []
+    
+    def mark_played(self, user_id: str, game_id: str, timestamp: str) -> bool:
+        """Record that a user played a game; True only for the call that created the marker"""
+        try:
+            result = self.played.update_one(
+                {"user_id": user_id, "game_id": game_id},
+                {"$setOnInsert": {"first_played_at": timestamp}},
+                upsert=True
+            )
+            return result.upserted_id is not None
+        except DuplicateKeyError:
+            # A concurrent first session created it
+            return False
+        except Exception as e:
+            logger.error(f"Error marking game {game_id} played for user {user_id}: {e}")
+            return False
+    
+    def backfill_played(self) -> int:
+        """Create the played_games markers for sessions recorded before they existed"""
+        try:
+            pairs = self.collection.aggregate([
+                {"$group": {
+                    "_id": {"user_id": "$user_id", "game_id": "$game_id"},
+                    "first_played_at": {"$min": "$timestamp"}
+                }}
+            ])
+            operations = [
+                UpdateOne(
+                    {"user_id": pair["_id"]["user_id"], "game_id": pair["_id"]["game_id"]},
+                    {"$setOnInsert": {"first_played_at": pair["first_played_at"]}},
+                    upsert=True
+                )
+                for pair in pairs
+            ]
+            if not operations:
+                return 0
+            
+            result = self.played.bulk_write(operations, ordered=False)
+            return result.upserted_count
+        except Exception as e:
+            logger.error(f"Error backfilling played games: {e}")
+            return 0
+    
+    def count_sessions(self) -> int:
+        try:
+            return self.collection.estimated_document_count()
+        except Exception as e:
+            logger.error(f"Error counting game sessions: {e}")
+            return 0
+    
+    def upsert_many(self, sessions: List[Dict[str, Any]]) -> int:
+        """Insert sessions keyed by session_id, skipping those already stored (safe to repeat)"""
+        if not sessions:
+            return 0
+        
+        try:
+            result = self.collection.bulk_write([
+                UpdateOne({"session_id": session["session_id"]}, {"$setOnInsert": session}, upsert=True)
+                for session in sessions
+            ], ordered=False)
+            return result.upserted_count + result.matched_count
+        except Exception as e:
+            logger.error(f"Error inserting game sessions: {e}")
+            return 0
+    
+    def delete_user_sessions(self, user_id: str) -> int:
+        try:
+            result = self.collection.delete_many({"user_id": user_id})
+            self.played.delete_many({"user_id": user_id})
+            return result.deleted_count
+        except Exception as e:
+            logger.error(f"Error deleting game sessions for user {user_id}: {e}")
+            return 0
+
+# Global instance
+game_session_ops = GameSessionOperations()
\ No newline at end of file
@@ -0,0 +1,56 @@
+from datetime import datetime, timedelta
+from pymongo.errors import DuplicateKeyError
+from ..connection import mongo_db
+import logging
+
+logger = logging.getLogger(__name__)
+
+class LeaseOperations:
+    """Named, expiring leases so only one app process runs a given job at a time"""
+    
+    def __init__(self):
+        self.collection = mongo_db.db.leases
+    
+    def acquire(self, name: str, holder: str, ttl_seconds: int) -> bool:
+        """Take the lease if it is free, expired or already ours; extends it by ttl_seconds"""
+        now = datetime.utcnow()
+        try:
+            self.collection.find_one_and_update(
+                {
+                    "name": name,
+                    "$or": [
+                        {"expires_at": {"$lte": now}},
+                        {"holder": holder}
+                    ]
+                },
+                {"$set": {"holder": holder, "acquired_at": now, "expires_at": now + timedelta(seconds=ttl_seconds)}},
+                upsert=True
+            )
+            return True
+        except DuplicateKeyError:
+            # The lease document exists and is held by someone else
+            return False
+        except Exception as e:
+            logger.error(f"Error acquiring lease {name}: {e}")
+            return False
+    
+    def release(self, name: str, holder: str) -> bool:
+        try:
+            result = self.collection.update_one(
+                {"name": name, "holder": holder},
+                {"$set": {"expires_at": datetime.utcnow()}}
+            )
+            return result.modified_count > 0
+        except Exception as e:
+            logger.error(f"Error releasing lease {name}: {e}")
+            return False
+    
+    def ensure_indexes(self) -> None:
+        try:
+            # The unique name index is what makes a contended upsert fail instead of duplicating
+            self.collection.create_index("name", unique=True)
+        except Exception as e:
+            logger.warning(f"Could not ensure lease indexes: {e}")
+
+# Global instance
+lease_ops = LeaseOperations()
\ No newline at end of file
@@ -1,4 +1,6 @@
 from typing import List, Optional, Dict, Any
+from datetime import datetime
+from pymongo import ReturnDocument
 from pymongo.errors import DuplicateKeyError
 from ..connection import mongo_db
 from ..models.promo_code import PromoCode
@@ -24,12 +26,19 @@ class PromoCodeOperations:
     
     def get_promo_by_code(self, code: str) -> Optional[PromoCode]:
         try:
-            data = self.collection.find_one({"code": code})
+            data = self.collection.find_one({"code": PromoCode.normalize_code(code)})
             return PromoCode.from_dict(data) if data else None
         except Exception as e:
             logger.error(f"Error getting promo code {code}: {e}")
             return None
     
+    def code_exists(self, code: str) -> bool:
+        try:
+            return self.collection.count_documents({"code": PromoCode.normalize_code(code)}, limit=1) > 0
+        except Exception as e:
+            logger.error(f"Error checking promo code {code}: {e}")
+            return False
+    
     def get_promo_by_id(self, promo_id: str) -> Optional[PromoCode]:
         try:
             data = self.collection.find_one({"id": promo_id})
@@ -97,7 +106,7 @@ class PromoCodeOperations:
                 return False
             
             result = self.collection.update_one(
-                {"code": code},
+                {"code": promo.code},
                 {
                     "$inc": {"uses_count": 1},
                     "$push": {"used_by": user_id}
@@ -108,6 +117,66 @@ class PromoCodeOperations:
             logger.error(f"Error using promo code {code} by user {user_id}: {e}")
             return False
     
+    def redeem_atomic(self, code: str, user: Dict[str, Any], timestamp: str = None) -> Optional[PromoCode]:
+        """Claim one use of a promo code for a user in a single conditional update.
+        
+        The limit check, the counter increment and the redeemed_by push happen in one
+        find_one_and_update, so concurrent redemptions cannot oversell a code.
+        Returns the post-update promo code, or None if the code cannot be redeemed.
+        """
+        try:
+            if not timestamp:
+                timestamp = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+            
+            redemption = {
+                'id': {"$literal": user['id']},
+                'username': {"$literal": user.get('username', '')},
+                'redeemed_at': {"$literal": timestamp},
+                'premium_given': {"$ifNull": ["$gives_premium", False]},
+                'slots_given': {"$ifNull": ["$slots", 0]}
+            }
+            
+            data = self.collection.find_one_and_update(
+                {
+                    "code": PromoCode.normalize_code(code),
+                    "redeemed_by.id": {"$ne": user['id']},
+                    "$and": [
+                        {"$or": [
+                            {"uses_limit": {"$lte": 0}},
+                            {"$expr": {"$lt": [{"$ifNull": ["$uses_count", 0]}, "$uses_limit"]}}
+                        ]},
+                        {"$or": [
+                            {"expires_at": None},
+                            {"expires_at": ""},
+                            {"expires_at": {"$gt": timestamp}}
+                        ]}
+                    ]
+                },
+                [
+                    {"$set": {
+                        "uses_count": {"$add": [{"$ifNull": ["$uses_count", 0]}, 1]},
+                        "redeemed_by": {"$concatArrays": [{"$ifNull": ["$redeemed_by", []]}, [redemption]]}
+                    }}
+                ],
+                return_document=ReturnDocument.AFTER
+            )
+            return PromoCode.from_dict(data) if data else None
+        except Exception as e:
+            logger.error(f"Error redeeming promo code {code} by user {user.get('id')}: {e}")
+            return None
+    
+    def release_redemption(self, code: str, user_id: str) -> bool:
+        """Give back the use of a promo code claimed by redeem_atomic (when applying it failed)"""
+        try:
+            result = self.collection.update_one(
+                {"code": PromoCode.normalize_code(code), "redeemed_by.id": user_id},
+                {"$inc": {"uses_count": -1}, "$pull": {"redeemed_by": {"id": user_id}}}
+            )
+            return result.modified_count > 0
+        except Exception as e:
+            logger.error(f"Error releasing promo code {code} redeemed by user {user_id}: {e}")
+            return False
+    
     def count_promo_codes(self, filter_dict: Dict[str, Any] = None) -> int:
         try:
             if filter_dict:
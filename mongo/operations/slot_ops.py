@@ -0,0 +1,247 @@
+from datetime import datetime
+from typing import List, Optional, Dict, Any
+from pymongo import ReturnDocument, UpdateOne
+from pymongo.errors import DuplicateKeyError
+from ..connection import mongo_db
+from ..models.slot import Slot
+import logging
+
+logger = logging.getLogger(__name__)
+
+class SlotOperations:
+    """Friend slots, one document per slot, indexed by owner (user_id) and assignee (assigned_to).
+    
+    This collection is the only record of which friends an owner has aligned.
+    """
+    
+    def __init__(self):
+        self.collection = mongo_db.db.slots
+    
+    def ensure_indexes(self) -> None:
+        try:
+            self.collection.create_index("slot_id", unique=True)
+            # Positions come from the owner's slot_positions counter; the index backs it up
+            self.collection.create_index([("user_id", 1), ("position", 1)], unique=True)
+            # A friend holds at most one slot of the same owner
+            self.collection.create_index(
+                [("user_id", 1), ("assigned_to", 1)],
+                unique=True,
+                partialFilterExpression={"assigned_to": {"$type": "string"}}
+            )
+            # Due-slot batches and the next-expiry lookup of the expiry scheduler
+            self.collection.create_index([("expired_at", 1), ("expires_at", 1)])
+        except Exception as e:
+            logger.warning(f"Could not ensure slot indexes: {e}")
+    
+    def create_slots(self, slots: List[Slot]) -> int:
+        if not slots:
+            return 0
+        
+        try:
+            result = self.collection.insert_many([slot.to_dict() for slot in slots], ordered=False)
+            return len(result.inserted_ids)
+        except Exception as e:
+            logger.error(f"Error creating slots: {e}")
+            return 0
+    
+    def upsert_many(self, slots: List[Slot]) -> int:
+        """Insert slots keyed by (user_id, position), skipping those already stored (safe to repeat)"""
+        if not slots:
+            return 0
+        
+        try:
+            result = self.collection.bulk_write([
+                UpdateOne({"user_id": slot.user_id, "position": slot.position}, {"$setOnInsert": slot.to_dict()}, upsert=True)
+                for slot in slots
+            ], ordered=False)
+            return result.upserted_count + result.matched_count
+        except Exception as e:
+            logger.error(f"Error upserting slots: {e}")
+            return 0
+    
+    def get_user_slots(self, user_id: str) -> List[Slot]:
+        """All slots of an owner (expired ones included), in the order they were added"""
+        try:
+            cursor = self.collection.find({"user_id": user_id}, {"_id": 0}).sort("position", 1)
+            return [Slot.from_dict(data) for data in cursor]
+        except Exception as e:
+            logger.error(f"Error getting slots of user {user_id}: {e}")
+            return []
+    
+    def count_active_slots(self, user_id: str, now: str) -> int:
+        """Slots of an owner that have not expired at now ('%Y-%m-%d %H:%M:%S')"""
+        try:
+            return self.collection.count_documents({
+                "user_id": user_id,
+                "expired_at": None,
+                "$or": [{"expires_at": None}, {"expires_at": {"$gt": now}}]
+            })
+        except Exception as e:
+            logger.error(f"Error counting active slots of user {user_id}: {e}")
+            return 0
+    
+    def count_free_slots(self, user_id: str, now: str) -> int:
+        try:
+            return self.collection.count_documents(dict(Slot.free_filter(now), user_id=user_id))
+        except Exception as e:
+            logger.error(f"Error counting free slots of user {user_id}: {e}")
+            return 0
+    
+    def get_assigned_slot(self, user_id: str, username: str) -> Optional[Slot]:
+        try:
+            data = self.collection.find_one({"user_id": user_id, "assigned_to": username}, {"_id": 0})
+            return Slot.from_dict(data) if data else None
+        except Exception as e:
+            logger.error(f"Error getting slot of user {user_id} assigned to {username}: {e}")
+            return None
+    
+    def assign_free_slot(self, user_id: str, username: str, timestamp: str) -> Optional[Slot]:
+        """Atomically claim the owner's first free slot for username.
+        
+        None if there is no free slot, or if username already holds one of the owner's slots.
+        """
+        try:
+            data = self.collection.find_one_and_update(
+                dict(Slot.free_filter(timestamp), user_id=user_id),
+                {
+                    "$set": {"assigned_to": username, "last_update": timestamp},
+                    "$push": {"users_history": {"username": username, "assigned_at": timestamp, "status": "active"}}
+                },
+                projection={"_id": 0},
+                sort=[("position", 1)],
+                return_document=ReturnDocument.AFTER
+            )
+            return Slot.from_dict(data) if data else None
+        except DuplicateKeyError:
+            logger.info(f"User {username} already holds a slot of user {user_id}")
+            return None
+        except Exception as e:
+            logger.error(f"Error assigning a slot of user {user_id} to {username}: {e}")
+            return None
+    
+    def release_slot(self, slot: Slot, status: str, timestamp: str, cooldown: bool = False) -> bool:
+        """Unassign a slot, closing its history entry as status ('removed', 'self_removed', ...).
+        
+        With cooldown the slot records last_removal_time, which limits reassignment.
+        """
+        if not slot.assigned_to:
+            return False
+        
+        try:
+            updates = {
+                "assigned_to": None,
+                "users_history": slot.released_history(slot.assigned_to, status, timestamp),
+                "last_update": timestamp
+            }
+            if cooldown:
+                updates["last_removal_time"] = timestamp
+            
+            result = self.collection.update_one(
+                {"slot_id": slot.slot_id, "assigned_to": slot.assigned_to},
+                {"$set": updates}
+            )
+            return result.modified_count > 0
+        except Exception as e:
+            logger.error(f"Error releasing slot {slot.slot_id}: {e}")
+            return False
+    
+    def get_due_slots(self, now: str, limit: int = 100) -> List[Slot]:
+        """Slots whose expires_at has passed but which are not marked expired yet"""
+        try:
+            cursor = self.collection.find(
+                {"expired_at": None, "expires_at": {"$lte": now}},
+                {"_id": 0}
+            ).sort("expires_at", 1).limit(limit)
+            return [Slot.from_dict(data) for data in cursor]
+        except Exception as e:
+            logger.error(f"Error getting due slots: {e}")
+            return []
+    
+    def next_slot_expiry(self, after: str) -> Optional[datetime]:
+        try:
+            data = self.collection.find_one(
+                {"expired_at": None, "expires_at": {"$gt": after}},
+                {"_id": 0, "expires_at": 1},
+                sort=[("expires_at", 1)]
+            )
+            return Slot.from_dict(data).expiry() if data else None
+        except Exception as e:
+            logger.error(f"Error getting next slot expiry: {e}")
+            return None
+    
+    def expire_slot(self, slot: Slot, timestamp: str) -> bool:
+        """Mark a due slot expired and unassign it (its history entry is closed as 'expired')"""
+        try:
+            updates = {
+                "expired_at": slot.expires_at,
+                "assigned_to": None,
+                "last_update": timestamp
+            }
+            if slot.assigned_to:
+                updates["users_history"] = slot.released_history(slot.assigned_to, 'expired', timestamp)
+            
+            result = self.collection.update_one(
+                {"slot_id": slot.slot_id, "expired_at": None, "assigned_to": slot.assigned_to},
+                {"$set": updates}
+            )
+            return result.modified_count > 0
+        except Exception as e:
+            logger.error(f"Error expiring slot {slot.slot_id}: {e}")
+            return False
+    
+    def release_owner_slots(self, user_ids: List[str], status: str, timestamp: str) -> List[str]:
+        """Unassign every assigned slot of the given owners (one read, one bulk write).
+        
+        Returns the usernames the slots were assigned to.
+        """
+        if not user_ids:
+            return []
+        
+        try:
+            cursor = self.collection.find(
+                {"user_id": {"$in": user_ids}, "assigned_to": {"$ne": None}},
+                {"_id": 0, "slot_id": 1, "assigned_to": 1, "users_history": 1}
+            )
+            operations = []
+            usernames = []
+            for data in cursor:
+                slot = Slot.from_dict(data)
+                operations.append(UpdateOne(
+                    {"slot_id": slot.slot_id, "assigned_to": slot.assigned_to},
+                    {"$set": {
+                        "assigned_to": None,
+                        "users_history": slot.released_history(slot.assigned_to, status, timestamp),
+                        "last_update": timestamp
+                    }}
+                ))
+                usernames.append(slot.assigned_to)
+            if not operations:
+                return []
+            
+            self.collection.bulk_write(operations, ordered=False)
+            return usernames
+        except Exception as e:
+            logger.error(f"Error releasing slots of users {user_ids}: {e}")
+            return []
+    
+    def delete_slots(self, slot_ids: List[str]) -> int:
+        if not slot_ids:
+            return 0
+        
+        try:
+            result = self.collection.delete_many({"slot_id": {"$in": slot_ids}})
+            return result.deleted_count
+        except Exception as e:
+            logger.error(f"Error deleting slots {slot_ids}: {e}")
+            return 0
+    
+    def delete_user_slots(self, user_id: str) -> int:
+        try:
+            result = self.collection.delete_many({"user_id": user_id})
+            return result.deleted_count
+        except Exception as e:
+            logger.error(f"Error deleting slots of user {user_id}: {e}")
+            return 0
+
+# Global instance
+slot_ops = SlotOperations()
\ No newline at end of file
@@ -0,0 +1,78 @@
+from typing import Optional, Dict, Any
+from datetime import datetime
+from ..connection import mongo_db
+import logging
+
+logger = logging.getLogger(__name__)
+
+class StatsOperations:
+    DASHBOARD_TYPE = 'dashboard'
+    GAMES_CATALOG_TYPE = 'games_catalog'
+    
+    def __init__(self):
+        self.collection = mongo_db.db.stats
+    
+    def get_dashboard_stats(self) -> Optional[Dict[str, Any]]:
+        try:
+            return self.collection.find_one({"type": self.DASHBOARD_TYPE}, {"_id": 0})
+        except Exception as e:
+            logger.error(f"Error getting dashboard stats: {e}")
+            return None
+    
+    def increment_dashboard_stats(self, counters: Dict[str, int]) -> bool:
+        """Apply counter deltas from a write path; only creates the document if it is missing"""
+        counters = {name: delta for name, delta in counters.items() if delta}
+        if not counters:
+            return True
+        
+        try:
+            self.collection.update_one(
+                {"type": self.DASHBOARD_TYPE},
+                {
+                    "$inc": counters,
+                    "$set": {"updated_at": datetime.now().strftime('%Y-%m-%d %H:%M:%S')}
+                },
+                upsert=True
+            )
+            return True
+        except Exception as e:
+            logger.error(f"Error incrementing dashboard stats {counters}: {e}")
+            return False
+    
+    def replace_dashboard_stats(self, values: Dict[str, Any]) -> bool:
+        """Overwrite the counters with freshly computed values (reconciliation)"""
+        try:
+            timestamp = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+            values = dict(values, type=self.DASHBOARD_TYPE, updated_at=timestamp, reconciled_at=timestamp)
+            self.collection.update_one(
+                {"type": self.DASHBOARD_TYPE},
+                {"$set": values},
+                upsert=True
+            )
+            return True
+        except Exception as e:
+            logger.error(f"Error replacing dashboard stats: {e}")
+            return False
+    
+    def get_games_catalog_meta(self) -> Optional[Dict[str, Any]]:
+        try:
+            return self.collection.find_one({"type": self.GAMES_CATALOG_TYPE}, {"_id": 0})
+        except Exception as e:
+            logger.error(f"Error getting games catalog meta: {e}")
+            return None
+    
+    def set_games_catalog_meta(self, meta: Dict[str, Any]) -> bool:
+        """Record which catalog version was persisted last, so other processes can adopt it"""
+        try:
+            self.collection.update_one(
+                {"type": self.GAMES_CATALOG_TYPE},
+                {"$set": dict(meta, type=self.GAMES_CATALOG_TYPE)},
+                upsert=True
+            )
+            return True
+        except Exception as e:
+            logger.error(f"Error setting games catalog meta: {e}")
+            return False
+
+# Global instance
+stats_ops = StatsOperations()
\ No newline at end of file
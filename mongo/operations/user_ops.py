@@ -1,4 +1,7 @@
-from typing import List, Optional, Dict, Any
+from typing import List, Optional, Dict, Any, Tuple
+import re
+from datetime import datetime, timedelta
+from pymongo import UpdateOne, ReturnDocument
 from pymongo.errors import DuplicateKeyError
 from ..connection import mongo_db
 from ..models.user import User
@@ -30,6 +33,25 @@ class UserOperations:
             logger.error(f"Error getting user by ID {user_id}: {e}")
             return None
     
+    def get_user_fields(self, user_id: str, fields: List[str], device_id: str = None) -> Optional[Dict[str, Any]]:
+        """Fetch only the given fields of a user as a raw dict, without the User round-trip.
+        
+        With device_id, active_devices is narrowed to the matching entry (or omitted if
+        the device is unknown) via an $elemMatch projection. Unlike a positional
+        `active_devices.$` projection this needs no device filter in the query, so an
+        unknown device does not look like an unknown user.
+        """
+        try:
+            projection = {"_id": 0}
+            projection.update({field: 1 for field in fields})
+            if device_id is not None:
+                projection["active_devices"] = {"$elemMatch": {"device_id": device_id}}
+            
+            return self.collection.find_one({"id": user_id}, projection)
+        except Exception as e:
+            logger.error(f"Error getting fields {fields} of user {user_id}: {e}")
+            return None
+    
     def get_user_by_username(self, username: str) -> Optional[User]:
         try:
             data = self.collection.find_one({"username": username})
@@ -38,6 +60,21 @@ class UserOperations:
             logger.error(f"Error getting user by username {username}: {e}")
             return None
     
+    def get_users_fields_by_usernames(self, usernames: List[str], fields: List[str]) -> Dict[str, Dict[str, Any]]:
+        """Fetch only the given fields of several users in one $in query, keyed by username"""
+        usernames = list(set(usernames))
+        if not usernames:
+            return {}
+        
+        try:
+            projection = {"_id": 0, "username": 1}
+            projection.update({field: 1 for field in fields})
+            cursor = self.collection.find({"username": {"$in": usernames}}, projection)
+            return {data["username"]: data for data in cursor}
+        except Exception as e:
+            logger.error(f"Error getting fields {fields} of users {usernames}: {e}")
+            return {}
+    
     def get_user_by_email(self, email: str) -> Optional[User]:
         try:
             data = self.collection.find_one({"email": email})
@@ -55,16 +92,27 @@ class UserOperations:
             return None
     
     def update_user(self, user_id: str, updates: Dict[str, Any]) -> bool:
+        if 'premium_expires_at' in updates:
+            updates = dict(updates, premium_expiry=User.parse_expiry(updates['premium_expires_at']))
         try:
             result = self.collection.update_one(
                 {"id": user_id},
-                {"$set": updates}
+                self._versioned({"$set": updates})
             )
             return result.modified_count > 0
         except Exception as e:
             logger.error(f"Error updating user {user_id}: {e}")
             return False
     
+    @staticmethod
+    def _versioned(update: Dict[str, Any]) -> Dict[str, Any]:
+        """The update plus an increment of the document's version counter.
+        
+        Every write to a user goes through this, so version changes whenever the
+        document does (the profile page uses it as its ETag).
+        """
+        return dict(update, **{"$inc": dict(update.get("$inc", {}), version=1)})
+    
     def delete_user(self, user_id: str) -> bool:
         try:
             result = self.collection.delete_one({"id": user_id})
@@ -96,6 +144,44 @@ class UserOperations:
             logger.error(f"Error counting users: {e}")
             return 0
     
+    def query_users_page(self, page: int = 1, per_page: int = 5, status: str = None,
+                         search: str = None, prefix_only: bool = False) -> Tuple[List[Dict[str, Any]], int]:
+        """One page of users for the admin list, filtered, sorted and sliced by MongoDB.
+        
+        Only the fields shown in the list are returned. Search is case-insensitive and
+        matches username or email, either as a substring or, with prefix_only, as a prefix.
+        """
+        try:
+            filter_dict = {}
+            if status and status.lower() != 'all':
+                # Exact match on the stored spelling, so the status index bounds the scan
+                # (an unknown status matches nothing)
+                filter_dict["status"] = User.normalize_status(status) or status
+            
+            if search:
+                pattern = re.escape(search)
+                if prefix_only:
+                    pattern = f"^{pattern}"
+                filter_dict["$or"] = [
+                    {"username": {"$regex": pattern, "$options": "i"}},
+                    {"email": {"$regex": pattern, "$options": "i"}}
+                ]
+            
+            page = max(page, 1)
+            per_page = max(per_page, 1)
+            projection = {"_id": 0, "id": 1, "username": 1, "email": 1, "status": 1, "join_date": 1}
+            
+            cursor = (self.collection.find(filter_dict, projection)
+                      .sort("_id", 1)
+                      .skip((page - 1) * per_page)
+                      .limit(per_page))
+            users = list(cursor)
+            total = self.collection.count_documents(filter_dict)
+            return users, total
+        except Exception as e:
+            logger.error(f"Error querying users page {page}: {e}")
+            return [], 0
+    
     def get_users_by_status(self, status: str) -> List[User]:
         try:
             cursor = self.collection.find({"status": status})
@@ -114,7 +200,7 @@ class UserOperations:
         try:
             result = self.collection.update_one(
                 {"id": user_id},
-                {"$push": {"devices": device_info}}
+                self._versioned({"$push": {"devices": device_info}})
             )
             return result.modified_count > 0
         except Exception as e:
@@ -125,12 +211,341 @@ class UserOperations:
         try:
             result = self.collection.update_one(
                 {"id": user_id},
-                {"$pull": {"devices": {"device_id": device_id}}}
+                self._versioned({"$pull": {"devices": {"device_id": device_id}}})
             )
             return result.modified_count > 0
         except Exception as e:
             logger.error(f"Error removing device from user {user_id}: {e}")
             return False
+    
+    def push_premium_history(self, user_id: str, entry: Dict[str, Any]) -> bool:
+        try:
+            result = self.collection.update_one(
+                {"id": user_id},
+                self._versioned({"$push": {"premium_history": entry}})
+            )
+            return result.modified_count > 0
+        except Exception as e:
+            logger.error(f"Error adding premium history for user {user_id}: {e}")
+            return False
+    
+    def allocate_slot_positions(self, user_id: str, count: int) -> Optional[int]:
+        """Reserve count consecutive slot positions of an owner; returns the first one.
+        
+        Positions come from an $inc on the owner's slot_positions counter, so
+        concurrent redemptions never share one.
+        """
+        try:
+            data = self.collection.find_one_and_update(
+                {"id": user_id},
+                {"$inc": {"slot_positions": count}},
+                projection={"_id": 0, "slot_positions": 1},
+                return_document=ReturnDocument.AFTER
+            )
+            return data["slot_positions"] - count if data else None
+        except Exception as e:
+            logger.error(f"Error allocating slot positions for user {user_id}: {e}")
+            return None
+    
+    def grant_aligned_premium(self, user_id: str, owner_username: str, history_entry: Dict[str, Any]) -> bool:
+        try:
+            result = self.collection.update_one(
+                {"id": user_id, "status": {"$ne": "Premium"}},
+                self._versioned({
+                    "$set": {"status": "Premium (Aligned)", "aligned_by": owner_username},
+                    "$push": {"premium_history": history_entry}
+                })
+            )
+            return result.modified_count > 0
+        except Exception as e:
+            logger.error(f"Error granting aligned premium to user {user_id}: {e}")
+            return False
+    
+    def revoke_aligned_premium(self, username: str, owner_username: Optional[str],
+                               history_entry: Dict[str, Any]) -> bool:
+        """Drop 'Premium (Aligned)' from a user aligned by owner_username (any owner if None)"""
+        try:
+            filter_dict = {"username": username, "status": "Premium (Aligned)"}
+            if owner_username is not None:
+                filter_dict["aligned_by"] = owner_username
+            
+            result = self.collection.update_one(
+                filter_dict,
+                self._versioned({
+                    "$set": {"status": "Standard", "aligned_by": None},
+                    "$push": {"premium_history": history_entry}
+                })
+            )
+            return result.modified_count > 0
+        except Exception as e:
+            logger.error(f"Error revoking aligned premium from {username}: {e}")
+            return False
+    
+    def clear_aligned_premium(self, usernames: List[str]) -> int:
+        """Drop aligned premium from the given users (whose slots were released)"""
+        if not usernames:
+            return 0
+        
+        try:
+            result = self.collection.update_many(
+                {"username": {"$in": usernames}, "status": "Premium (Aligned)"},
+                self._versioned({"$set": {"status": "Standard", "aligned_by": None}})
+            )
+            return result.modified_count
+        except Exception as e:
+            logger.error(f"Error clearing aligned premium of users {usernames}: {e}")
+            return 0
+    
+    def disconnect_device(self, user_id: str, device_id: str) -> bool:
+        """Flag one active device for forced disconnect and drop it from the devices list"""
+        try:
+            result = self.collection.update_one(
+                {"id": user_id, "active_devices.device_id": device_id},
+                self._versioned({
+                    "$pull": {"devices": {"device_id": device_id}},
+                    "$set": {
+                        "active_devices.$.disconnected": True,
+                        "active_devices.$.force_disconnect": True
+                    }
+                })
+            )
+            if result.matched_count == 0:
+                return False
+            
+            # Mark the launcher offline once no connected device is left
+            self.collection.update_one(
+                {"id": user_id, "active_devices": {"$not": {"$elemMatch": {"disconnected": {"$ne": True}}}}},
+                self._versioned({"$set": {"launcher_connected": False}})
+            )
+            return True
+        except Exception as e:
+            logger.error(f"Error disconnecting device {device_id} of user {user_id}: {e}")
+            return False
+    
+    def reset_primary_device(self, user_id: str, reset_entry: Dict[str, Any],
+                             active_devices: List[Dict[str, Any]]) -> bool:
+        try:
+            result = self.collection.update_one(
+                {"id": user_id, "primary_device": {"$ne": None}},
+                self._versioned({
+                    "$set": {"primary_device": None, "active_devices": active_devices, "launcher_connected": False},
+                    "$push": {"device_reset_history": reset_entry}
+                })
+            )
+            return result.modified_count > 0
+        except Exception as e:
+            logger.error(f"Error resetting primary device of user {user_id}: {e}")
+            return False
+    
+    def touch_device(self, user_id: str, device_id: str, timestamp: str) -> bool:
+        try:
+            result = self.collection.update_one(
+                {"id": user_id, "devices.device_id": device_id},
+                self._versioned({"$set": {"devices.$.last_connection": timestamp}})
+            )
+            return result.modified_count > 0
+        except Exception as e:
+            logger.error(f"Error updating device {device_id} of user {user_id}: {e}")
+            return False
+    
+    def record_game_session(self, user_id: str, last_session: Dict[str, Any],
+                            play_minutes: int, new_game: bool) -> bool:
+        """Add a session to the per-user play aggregates; the session itself lives in game_sessions.
+        
+        The counters are incremented in place, so concurrent reports never overwrite
+        each other; total_play_time is derived from total_play_minutes on read.
+        """
+        try:
+            update = {
+                "$set": {"last_session": last_session},
+                "$inc": {"total_play_minutes": play_minutes, "games_played": int(new_game)},
+                "$unset": {"total_play_time": ""}
+            }
+            
+            result = self.collection.update_one({"id": user_id}, self._versioned(update))
+            return result.modified_count > 0
+        except Exception as e:
+            logger.error(f"Error recording game session for user {user_id}: {e}")
+            return False
+    
+    def ensure_indexes(self) -> None:
+        try:
+            # Serves both the due-expiry batches and the next-expiry lookup of the scheduler
+            self.collection.create_index([("status", 1), ("premium_expiry", 1)])
+            # Walked by the $graphLookup of the premium revocation cascade
+            self.collection.create_index("aligned_by", sparse=True)
+        except Exception as e:
+            logger.warning(f"Could not ensure user indexes: {e}")
+    
+    def get_expired_premium_users(self, now: datetime, limit: int = 100) -> List[Dict[str, Any]]:
+        """Premium users whose subscription expired at or before now, oldest expiry first"""
+        try:
+            cursor = self.collection.find(
+                {"status": "Premium", "premium_expiry": {"$lte": now}},
+                {"_id": 0}
+            ).sort("premium_expiry", 1).limit(limit)
+            return list(cursor)
+        except Exception as e:
+            logger.error(f"Error getting expired premium users: {e}")
+            return []
+    
+    def next_premium_expiry(self, after: datetime) -> Optional[datetime]:
+        """The earliest premium expiry still ahead of `after`, or None if there is none"""
+        try:
+            data = self.collection.find_one(
+                {"status": "Premium", "premium_expiry": {"$gt": after}},
+                {"_id": 0, "premium_expiry": 1},
+                sort=[("premium_expiry", 1)]
+            )
+            return data["premium_expiry"] if data else None
+        except Exception as e:
+            logger.error(f"Error getting next premium expiry: {e}")
+            return None
+    
+    def revoke_premium_cascade(self, user_id: str, reason: str, timestamp: str,
+                               guard: Optional[Dict[str, Any]] = None) -> List[Dict[str, Any]]:
+        """Drop a user to Standard together with everyone aligned through their slots, transitively.
+        
+        One $graphLookup follows aligned_by from the user to everyone aligned through
+        them, transitively; all changes are then written with one bulk_write. Every
+        write re-checks its own condition, so changes made since the read are not
+        overwritten. The slots they held are released by the caller.
+        
+        guard adds conditions the user must still meet (e.g. an expiry in the past).
+        Returns the revoked users as {id, username, status} with their previous status.
+        """
+        try:
+            match = dict(guard or {}, id=user_id)
+            result = list(self.collection.aggregate([
+                {"$match": match},
+                {"$graphLookup": {
+                    "from": self.collection.name,
+                    "startWith": "$username",
+                    "connectFromField": "username",
+                    "connectToField": "aligned_by",
+                    "restrictSearchWithMatch": {"status": "Premium (Aligned)"},
+                    "depthField": "depth",
+                    "as": "aligned"
+                }},
+                {"$project": {
+                    "_id": 0, "id": 1, "username": 1, "status": 1,
+                    "aligned.id": 1, "aligned.username": 1, "aligned.status": 1,
+                    "aligned.aligned_by": 1, "aligned.depth": 1
+                }}
+            ]))
+            if not result:
+                return []
+            root = result[0]
+            
+            operations = [UpdateOne(match, self._revocation_update(
+                timestamp, f"Premium status removed. {reason} All devices disconnected."
+            ))]
+            revoked = [{"id": root["id"], "username": root["username"], "status": root.get("status")}]
+            # Nearest first, in the order the alignment tree is unwound
+            for friend in sorted(root.get("aligned", []), key=lambda user: user.get("depth", 0)):
+                if friend["username"] == root["username"]:
+                    continue
+                operations.append(UpdateOne(
+                    {"id": friend["id"], "status": "Premium (Aligned)", "aligned_by": friend["aligned_by"]},
+                    self._revocation_update(
+                        timestamp,
+                        f"Premium status removed. Alignment from {friend['aligned_by']} was removed. All devices disconnected.",
+                        aligned=True
+                    )
+                ))
+                revoked.append({"id": friend["id"], "username": friend["username"], "status": friend.get("status")})
+            
+            bulk_result = self.collection.bulk_write(operations, ordered=True)
+            if bulk_result.modified_count < len(operations):
+                logger.warning(f"Premium revocation of user {user_id}: {bulk_result.modified_count} of {len(operations)} users changed")
+            return revoked
+        except Exception as e:
+            logger.error(f"Error revoking premium of user {user_id}: {e}")
+            return []
+    
+    @staticmethod
+    def _revocation_update(timestamp: str, details: str, aligned: bool = False) -> Dict[str, Any]:
+        updates = {
+            "status": "Standard",
+            "premium_expires_at": None,
+            "premium_expiry": None,
+            "launcher_connected": False,
+            "devices": [],
+            "active_devices": []
+        }
+        if aligned:
+            updates["aligned_by"] = None
+        return {
+            "$set": updates,
+            "$inc": {"version": 1},
+            "$unset": {"launcher_code": ""},
+            "$push": {"premium_history": {
+                "date": timestamp,
+                "action": "Premium Status Revoked",
+                "details": details
+            }}
+        }
+    
+    def dashboard_stats(self, now: datetime = None,
+                        premium_statuses: Tuple[str, ...] = ('Premium', 'Premium (Aligned)')) -> Dict[str, int]:
+        """Admin dashboard user counters computed in one $facet aggregation.
+        
+        Only the fields the counters need leave the projection stage, so no full user
+        documents are sent to the app. Windows cover the 24 hours before `now`; a user
+        is daily-active when their last_session falls inside the window.
+        """
+        if now is None:
+            now = datetime.now()
+        yesterday = now - timedelta(days=1)
+        stats = {"total_users": 0, "premium_users": 0, "online_users": 0,
+                 "daily_users": 0, "new_users": 0}
+        
+        try:
+            pipeline = [
+                {
+                    "$project": {
+                        "_id": 0,
+                        "status": 1,
+                        "launcher_connected": 1,
+                        "join_date": 1,
+                        "last_session.timestamp": 1
+                    }
+                },
+                {
+                    "$facet": {
+                        "total_users": [{"$count": "count"}],
+                        "premium_users": [
+                            {"$match": {"status": {"$in": list(premium_statuses)}}},
+                            {"$count": "count"}
+                        ],
+                        "online_users": [
+                            {"$match": {"launcher_connected": True}},
+                            {"$count": "count"}
+                        ],
+                        # join_date only has day precision, so "joined in the last 24h" means joined after yesterday's date
+                        "new_users": [
+                            {"$match": {"join_date": {"$gt": yesterday.strftime('%Y-%m-%d')}}},
+                            {"$count": "count"}
+                        ],
+                        "daily_users": [
+                            {"$match": {"last_session.timestamp": {"$gte": yesterday.strftime('%Y-%m-%d %H:%M:%S')}}},
+                            {"$count": "count"}
+                        ]
+                    }
+                }
+            ]
+            
+            result = list(self.collection.aggregate(pipeline))
+            facets = result[0] if result else {}
+            for name in stats:
+                items = facets.get(name) or []
+                if items:
+                    stats[name] = items[0]["count"]
+            
+            return stats
+        except Exception as e:
+            logger.error(f"Error computing dashboard stats: {e}")
+            return stats
 
 # Global instance
 user_ops = UserOperations()
\ No newline at end of file
@@ -3,11 +3,16 @@ import os
 from datetime import datetime
 from typing import Dict, List, Any
 import logging
+from pymongo.errors import DuplicateKeyError
 from ..connection import mongo_db
 from ..operations.user_ops import user_ops
 from ..operations.promo_ops import promo_ops
+from ..operations.game_session_ops import game_session_ops
+from ..operations.slot_ops import slot_ops
 from ..models.user import User
 from ..models.promo_code import PromoCode
+from ..models.game_session import GameSession
+from ..models.slot import Slot
 
 logger = logging.getLogger(__name__)
 
@@ -30,7 +35,10 @@ class DataMigration:
             migrated_count = 0
             for user_data in users_data:
                 user = User.from_dict(user_data)
+                slots = self._legacy_slots(user_data)
+                user.slot_positions = len(slots)
                 if user_ops.create_user(user):
+                    slot_ops.upsert_many(slots)
                     migrated_count += 1
                 else:
                     logger.warning(f"Failed to migrate user: {user.username}")
@@ -109,6 +117,188 @@ class DataMigration:
             logger.error(f"Error exporting promo codes to JSON: {e}")
             return 0
     
+    def normalize_promo_codes(self) -> int:
+        """Backfill canonical (upper-case) promo codes so lookups can use the unique code index"""
+        collection = mongo_db.db.promo_codes
+        
+        try:
+            collection.create_index("code", unique=True)
+        except Exception as e:
+            logger.warning(f"Could not ensure promo code index: {e}")
+        
+        normalized_count = 0
+        try:
+            for data in collection.find({}, {"_id": 1, "code": 1}):
+                code = data.get('code') or ''
+                normalized = PromoCode.normalize_code(code)
+                if code == normalized:
+                    continue
+                
+                try:
+                    collection.update_one({"_id": data["_id"]}, {"$set": {"code": normalized}})
+                    normalized_count += 1
+                except DuplicateKeyError:
+                    logger.warning(f"Cannot normalize promo code {code}: {normalized} already exists")
+            
+            logger.info(f"Normalized {normalized_count} promo codes")
+            return normalized_count
+        
+        except Exception as e:
+            logger.error(f"Error normalizing promo codes: {e}")
+            return normalized_count
+    
+    def migrate_game_sessions(self) -> int:
+        """Move embedded user game_sessions arrays into the game_sessions collection.
+        
+        Each user keeps only the aggregates (games_played, total_play_minutes,
+        last_session). Safe to re-run: session ids are derived from the user and
+        the position of the embedded entry and inserted with an upsert, so a run
+        interrupted before a user's array was unset copies nothing twice.
+        Also creates the played_games markers of the migrated sessions.
+        """
+        collection = mongo_db.db.users
+        game_session_ops.ensure_indexes()
+        
+        migrated_count = 0
+        try:
+            cursor = collection.find(
+                {"$or": [{"game_sessions": {"$exists": True}}, {"total_play_minutes": {"$exists": False}}]},
+                {"_id": 1, "id": 1, "game_sessions": 1, "total_play_time": 1}
+            )
+            for data in cursor:
+                sessions = []
+                for index, record in enumerate(data.get('game_sessions') or []):
+                    session = GameSession.from_dict(dict(record, user_id=data.get('id', '')))
+                    session.session_id = record.get('session_id') or GameSession.legacy_session_id(session.user_id, index)
+                    session.duration_minutes = GameSession.parse_duration(session.duration)
+                    sessions.append(session.to_dict())
+                
+                if len(sessions) != game_session_ops.upsert_many(sessions):
+                    logger.warning(f"Failed to migrate game sessions of user {data.get('id')}")
+                    continue
+                
+                collection.update_one(
+                    {"_id": data["_id"]},
+                    {
+                        "$set": {"total_play_minutes": GameSession.parse_duration(data.get('total_play_time'))},
+                        "$unset": {"game_sessions": ""}
+                    }
+                )
+                migrated_count += len(sessions)
+            
+            game_session_ops.backfill_played()
+            logger.info(f"Migrated {migrated_count} game sessions")
+            return migrated_count
+        
+        except Exception as e:
+            logger.error(f"Error migrating game sessions: {e}")
+            return migrated_count
+    
+    def backfill_premium_expiry(self) -> int:
+        """Add the BSON date premium_expiry next to existing premium_expires_at strings"""
+        collection = mongo_db.db.users
+        user_ops.ensure_indexes()
+        
+        updated_count = 0
+        try:
+            cursor = collection.find(
+                {"premium_expires_at": {"$type": "string"}, "premium_expiry": {"$exists": False}},
+                {"_id": 1, "premium_expires_at": 1}
+            )
+            for data in cursor:
+                collection.update_one(
+                    {"_id": data["_id"]},
+                    {"$set": {"premium_expiry": User.parse_expiry(data["premium_expires_at"])}}
+                )
+                updated_count += 1
+            
+            logger.info(f"Backfilled premium expiry of {updated_count} users")
+            return updated_count
+        
+        except Exception as e:
+            logger.error(f"Error backfilling premium expiry: {e}")
+            return updated_count
+    
+    @staticmethod
+    def _legacy_slots(user_data: Dict[str, Any]) -> List[Slot]:
+        """Slot documents for a user's embedded slots_info/expired_slots arrays.
+        
+        The friend in a slot was the entry of friends with the same index. Slots
+        keep the uuid they had under 'id'; the others get one derived from the
+        user and the position, so every run produces the same documents.
+        """
+        user_id = user_data.get('id', '')
+        friends = user_data.get('friends') or []
+        slots = []
+        
+        def to_slot(record, position):
+            record = dict(record, user_id=user_id, position=position)
+            record['slot_id'] = record.get('slot_id') or record.get('id') or Slot.legacy_slot_id(user_id, position)
+            return Slot.from_dict(record)
+        
+        for index, record in enumerate(user_data.get('slots_info') or []):
+            slot = to_slot(record, index)
+            slot.assigned_to = friends[index] if index < len(friends) else None
+            slots.append(slot)
+        
+        for record in user_data.get('expired_slots') or []:
+            slot = to_slot(record, len(slots))
+            slot.expired_at = slot.expired_at or slot.expires_at or slot.last_update
+            if slot.assigned_to and not slot.users_history:
+                slot.users_history = [{'username': slot.assigned_to, 'status': 'expired'}]
+            slot.assigned_to = None
+            slots.append(slot)
+        return slots
+    
+    def migrate_slots(self) -> int:
+        """Move embedded user slots_info/expired_slots arrays into the slots collection.
+        
+        The slots collection is the only record of who holds a slot, so the old
+        friends mirror is dropped, and each owner's slot_positions counter is set
+        past their highest slot position.
+        Safe to re-run: slots are upserted by (user_id, position) with stable ids, so
+        a run interrupted before a user's arrays were unset copies nothing twice.
+        """
+        collection = mongo_db.db.users
+        slot_ops.ensure_indexes()
+        
+        migrated_count = 0
+        try:
+            cursor = collection.find(
+                {"$or": [
+                    {"slots_info": {"$exists": True}},
+                    {"expired_slots": {"$exists": True}},
+                    {"friends": {"$exists": True}}
+                ]},
+                {"_id": 1, "id": 1, "friends": 1, "slots_info": 1, "expired_slots": 1}
+            )
+            for data in cursor:
+                slots = self._legacy_slots(data)
+                if len(slots) != slot_ops.upsert_many(slots):
+                    logger.warning(f"Failed to migrate slots of user {data.get('id')}")
+                    continue
+                
+                collection.update_one(
+                    {"_id": data["_id"]},
+                    {"$unset": {"slots_info": "", "expired_slots": "", "friends": ""}}
+                )
+                migrated_count += len(slots)
+            
+            for entry in mongo_db.db.slots.aggregate([
+                {"$group": {"_id": "$user_id", "last_position": {"$max": "$position"}}}
+            ]):
+                collection.update_one(
+                    {"id": entry["_id"]},
+                    {"$max": {"slot_positions": entry["last_position"] + 1}}
+                )
+            
+            logger.info(f"Migrated {migrated_count} slots")
+            return migrated_count
+        
+        except Exception as e:
+            logger.error(f"Error migrating slots: {e}")
+            return migrated_count
+    
     def migrate_all_from_json(self) -> Dict[str, int]:
         results = {
             'users': 0,
@@ -161,6 +351,10 @@ class DataMigration:
             result = mongo_db.db.sessions.delete_many({})
             results['sessions'] = result.deleted_count
             
+            # Clear game sessions
+            result = mongo_db.db.game_sessions.delete_many({})
+            results['game_sessions'] = result.deleted_count
+            
             # Clear devices
             result = mongo_db.db.devices.delete_many({})
             results['devices'] = result.deleted_count
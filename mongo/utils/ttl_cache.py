@@ -0,0 +1,92 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Optional
+
+class TTLCache:
+    """Bounded, thread-safe LRU cache whose entries also expire after `ttl` seconds.
+    
+    Meant for per-process caching of hot read paths. Writers must call
+    invalidate() for keys whose backing data they change; the TTL only bounds
+    how stale an entry can get when some other process changed it.
+    """
+    
+    def __init__(self, maxsize: int = 10000, ttl: float = 10.0):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+    
+    def get(self, key: Hashable) -> Optional[Any]:
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            
+            expires, value = entry
+            if expires <= time.monotonic():
+                del self._data[key]
+                self.misses += 1
+                return None
+            
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+    
+    def set(self, key: Hashable, value: Any) -> None:
+        with self._lock:
+            self._data[key] = (time.monotonic() + self.ttl, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                self.evictions += 1
+    
+    def get_or_load(self, key: Hashable, loader: Callable[[], Any]) -> Optional[Any]:
+        """Return the cached value, or call loader() and cache its result unless it is None"""
+        value = self.get(key)
+        if value is None:
+            value = loader()
+            if value is not None:
+                self.set(key, value)
+        return value
+    
+    def invalidate(self, key: Hashable) -> None:
+        with self._lock:
+            self._data.pop(key, None)
+    
+    def invalidate_where(self, predicate: Callable[[Any], bool]) -> int:
+        """Drop every entry whose value matches predicate; for writers that only know a secondary key"""
+        with self._lock:
+            keys = [key for key, (_, value) in self._data.items() if predicate(value)]
+            for key in keys:
+                del self._data[key]
+            return len(keys)
+    
+    def invalidate_keys(self, predicate: Callable[[Hashable], bool]) -> int:
+        """Drop every entry whose key matches predicate; for composite keys sharing a component"""
+        with self._lock:
+            keys = [key for key in self._data if predicate(key)]
+            for key in keys:
+                del self._data[key]
+            return len(keys)
+    
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+    
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'size': len(self._data),
+                'maxsize': self.maxsize,
+                'ttl': self.ttl,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'hit_rate': round(self.hits / lookups, 4) if lookups else 0.0
+            }
\ No newline at end of file
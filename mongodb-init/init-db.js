@@ -8,6 +8,9 @@ db.createCollection('users');
 db.users.createIndex({ "username": 1 }, { unique: true });
 db.users.createIndex({ "email": 1 }, { unique: true });
 db.users.createIndex({ "id": 1 }, { unique: true });
+db.users.createIndex({ "status": 1 });
+db.users.createIndex({ "status": 1, "premium_expiry": 1 });
+db.users.createIndex({ "aligned_by": 1 }, { sparse: true });
 
 // Create promo_codes collection
 db.createCollection('promo_codes');
@@ -31,6 +34,18 @@ db.sessions.createIndex({ "session_id": 1 }, { unique: true });
 db.sessions.createIndex({ "user_id": 1 });
 db.sessions.createIndex({ "expires_at": 1 }, { expireAfterSeconds: 0 });
 
+// Create game_sessions collection for play history
+db.createCollection('game_sessions');
+
+// Create indexes for game_sessions collection
+db.game_sessions.createIndex({ "user_id": 1, "timestamp": -1 });
+db.game_sessions.createIndex({ "session_id": 1 }, { unique: true });
+db.game_sessions.createIndex({ "user_id": 1, "game_id": 1 });
+
+// One marker per game a user has played (counts games_played)
+db.createCollection('played_games');
+db.played_games.createIndex({ "user_id": 1, "game_id": 1 }, { unique: true });
+
 // Create stats collection for analytics
 db.createCollection('stats');
 
@@ -49,9 +64,21 @@ db.devices.createIndex({ "device_id": 1 }, { unique: true });
 db.createCollection('slots');
 
 // Create indexes for slots collection
-db.slots.createIndex({ "user_id": 1 });
+db.slots.createIndex({ "user_id": 1, "position": 1 }, { unique: true });
+db.slots.createIndex(
+    { "user_id": 1, "assigned_to": 1 },
+    { unique: true, partialFilterExpression: { "assigned_to": { $type: "string" } } }
+);
+db.slots.createIndex({ "expired_at": 1, "expires_at": 1 });
 db.slots.createIndex({ "slot_id": 1 }, { unique: true });
 
+// Create leases collection for single-worker background jobs
+db.createCollection('leases');
+db.leases.createIndex({ "name": 1 }, { unique: true });
+
+// Create capped cache_events collection for cross-worker cache invalidation
+db.createCollection('cache_events', { capped: true, size: 1048576, max: 10000 });
+
 print('SWA Database initialized successfully with collections and indexes');
 
 // Insert sample admin user if needed